@@ -0,0 +1,92 @@
+"""
+Asynchronous PostgreSQL access for EMR system built on asyncpg
+Accepts the same %s-style queries as database.py so services can share SQL between both layers
+"""
+
+import asyncio
+import logging
+import threading
+from typing import List, Dict, Optional
+
+import asyncpg
+
+from config import db_config
+from database import DatabaseError, positional_query
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class AsyncEMRDatabase:
+    """
+    asyncpg connection pool for I/O-bound callers that keep many queries in flight
+    asyncpg prepares and caches statements per connection, so no PREPARE bookkeeping is needed here
+    """
+    
+    def __init__(self):
+        """Defer pool creation to the first query; an asyncpg pool belongs to the event loop that opened it"""
+        self.pool = None
+        self._pool_lock = None
+        self._loop = None
+        self._loop_lock = threading.Lock()
+    
+    async def _get_pool(self):
+        """Return the connection pool, opening it on first use"""
+        if self.pool is None:
+            if self._pool_lock is None:
+                self._pool_lock = asyncio.Lock()
+            async with self._pool_lock:
+                if self.pool is None:
+                    try:
+                        self.pool = await asyncpg.create_pool(
+                            host=db_config.host,
+                            port=db_config.port,
+                            database=db_config.database,
+                            user=db_config.username,
+                            password=db_config.password,
+                            min_size=1,
+                            max_size=db_config.pool_size + db_config.max_overflow,
+                            statement_cache_size=db_config.prepared_cache_size
+                        )
+                        logger.info("Async database connection pool initialized successfully")
+                    except Exception as e:
+                        logger.error(f"Failed to initialize async database connection pool: {e}")
+                        raise DatabaseError(f"Database connection failed: {e}")
+        return self.pool
+    
+    async def execute_query(self, query: str, params: tuple = None, fetch: bool = True) -> Optional[List[Dict]]:
+        """
+        Execute a %s-style parameterized query
+        Returns rows as dicts when fetch is set, otherwise None
+        """
+        pool = await self._get_pool()
+        statement, _ = positional_query(query)
+        try:
+            if fetch:
+                rows = await pool.fetch(statement, *(params or ()))
+                return [dict(row) for row in rows]
+            await pool.execute(statement, *(params or ()))
+            return None
+        except Exception as e:
+            logger.error(f"Async query execution failed: {e}")
+            raise DatabaseError(f"Query failed: {e}")
+    
+    def run(self, coroutine):
+        """
+        Run a coroutine from synchronous code and wait for its result
+        All such calls share one background event loop, and with it one pool
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='emr-adb-loop', daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+    
+    async def close(self):
+        """Close all database connections"""
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+            logger.info("Async database connection pool closed")
+
+# Global async database instance
+adb = AsyncEMRDatabase()
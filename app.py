@@ -12,10 +12,11 @@ import uuid
 from werkzeug.utils import secure_filename
 from functools import wraps
 from config import app_config
-from database import initialize_database, DatabaseError, json_serializer
+from database import db, initialize_database, DatabaseError, json_serializer
 from services import (
     patient_service, medication_service, condition_service, diagnosis_service,
-    clinical_note_service, allergy_service, immunization_service, appointment_service
+    clinical_note_service, allergy_service, immunization_service, appointment_service,
+    DEFAULT_PAGE_SIZE, warm_prepared_statements
 )
 # Import X-ray analysis functions
 from xray_analysis_gpt4 import load_and_preprocess_image, analyze_xray_with_model, analyze_with_gpt4
@@ -55,6 +56,45 @@ def handle_database_error(func):
             return jsonify({'error': 'An unexpected error occurred'}), 500
     return wrapper
 
+# Largest page a list endpoint returns, whatever ?limit asks for
+MAX_PAGE_SIZE = 500
+
+def stream_json_array(rows):
+    """Yield a JSON array one element at a time so large lists never sit in memory whole"""
+    yield '['
+    for index, row in enumerate(rows):
+        yield (',' if index else '') + json.dumps(row, default=json_serializer)
+    yield ']'
+
+def query_flag(name):
+    """True only for an explicit ?name=1/true/yes, so ?name=0 or ?name=false leaves the option off"""
+    return request.args.get(name, '').strip().lower() in ('1', 'true', 'yes')
+
+def patient_records_response(service, patient_id):
+    """
+    Return a page of a patient's records, as a {columns, rows} envelope when ?format=columnar is requested
+    ?fields=a,b,c selects columns other than the service's list-view defaults;
+    ?limit=N sets the page size and ?before=<created_at>&before_id=<id> continues after a row;
+    ?stream=1 returns every record as a chunked JSON array instead of a page
+    """
+    fields = request.args.get('fields')
+    columns = [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+    try:
+        if query_flag('stream'):
+            return Response(stream_json_array(service.iter_all(patient_id, columns)), mimetype='application/json')
+        
+        limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        before = request.args.get('before')
+        before = datetime.fromisoformat(before) if before else None
+        before_id = request.args.get('before_id')
+        before_id = int(before_id) if before_id else None
+        
+        if request.args.get('format') == 'columnar':
+            return jsonify(service.get_all_columnar(patient_id, columns, limit, before, before_id))
+        return jsonify(service.get_all(patient_id, columns, limit, before, before_id))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
 @app.route('/')
 def index():
     """Home route - redirect to dashboard if logged in, otherwise to login"""
@@ -157,23 +197,23 @@ def search_patients():
 @handle_database_error
 def get_patient(patient_id):
     """API endpoint to get complete patient details"""
-    # Get patient demographics
-    patient = patient_service.get_by_id(patient_id)
-    if not patient:
+    # Get demographics and all related medical information in one query
+    chart = patient_service.get_full_chart(patient_id)
+    if not chart:
         return jsonify({'error': 'Patient not found'}), 404
     
-    # Get all related medical information
+    patient = chart['patient']
     patient_data = {
         'id': patient['id'],
         'name': f"{patient['first_name']} {patient['last_name']}",
-        'demographics': dict(patient),
-        'medications': medication_service.get_all(patient_id),
-        'conditions': condition_service.get_all(patient_id),
-        'diagnosis': diagnosis_service.get_all(patient_id),
-        'clinical_notes': clinical_note_service.get_all(patient_id),
-        'allergies': allergy_service.get_all(patient_id),
-        'immunizations': immunization_service.get_all(patient_id),
-        'appointments': appointment_service.get_all(patient_id)
+        'demographics': patient,
+        'medications': chart['medications'],
+        'conditions': chart['conditions'],
+        'diagnosis': chart['diagnoses'],
+        'clinical_notes': chart['clinical_notes'],
+        'allergies': chart['allergies'],
+        'immunizations': chart['immunizations'],
+        'appointments': chart['appointments']
     }
     
     logger.info(f"Retrieved complete patient data for patient {patient_id}")
@@ -227,8 +267,7 @@ def update_patient_demographics(patient_id):
 @handle_database_error
 def get_medications(patient_id):
     """Get all medications for a patient"""
-    medications = medication_service.get_all(patient_id)
-    return jsonify(medications)
+    return patient_records_response(medication_service, patient_id)
 
 @app.route('/api/patients/<int:patient_id>/medications', methods=['POST'])
 @login_required
@@ -273,8 +312,7 @@ def delete_medication(medication_id):
 @handle_database_error
 def get_conditions(patient_id):
     """Get all conditions for a patient"""
-    conditions = condition_service.get_all(patient_id)
-    return jsonify(conditions)
+    return patient_records_response(condition_service, patient_id)
 
 @app.route('/api/patients/<int:patient_id>/conditions', methods=['POST'])
 @login_required
@@ -319,8 +357,7 @@ def delete_condition(condition_id):
 @handle_database_error
 def get_diagnoses(patient_id):
     """Get all diagnoses for a patient"""
-    diagnoses = diagnosis_service.get_all(patient_id)
-    return jsonify(diagnoses)
+    return patient_records_response(diagnosis_service, patient_id)
 
 @app.route('/api/patients/<int:patient_id>/diagnoses', methods=['POST'])
 @login_required
@@ -365,15 +402,14 @@ def delete_diagnosis(diagnosis_id):
 @handle_database_error
 def get_clinical_notes(patient_id):
     """Get all clinical notes for a patient"""
-    notes = clinical_note_service.get_all(patient_id)
-    return jsonify(notes)
+    return patient_records_response(clinical_note_service, patient_id)
 
 @app.route('/api/patient/<int:patient_id>/clinical_notes', methods=['GET'])
 @login_required
 @handle_database_error
 def get_clinical_notes_for_polling(patient_id):
     """Get clinical notes for polling - returns in expected format"""
-    notes = clinical_note_service.get_all(patient_id)
+    notes = clinical_note_service.get_all(patient_id, columns=('id', 'date', 'provider', 'type', 'note'), limit=None)
     return jsonify({'success': True, 'data': notes})
 
 @app.route('/api/patients/<int:patient_id>/clinical-notes', methods=['POST'])
@@ -418,8 +454,7 @@ def delete_clinical_note(note_id):
 @handle_database_error
 def get_allergies(patient_id):
     """Get all allergies for a patient"""
-    allergies = allergy_service.get_all(patient_id)
-    return jsonify(allergies)
+    return patient_records_response(allergy_service, patient_id)
 
 @app.route('/api/patients/<int:patient_id>/allergies', methods=['POST'])
 @login_required
@@ -464,8 +499,7 @@ def delete_allergy(allergy_id):
 @handle_database_error
 def get_immunizations(patient_id):
     """Get all immunizations for a patient"""
-    immunizations = immunization_service.get_all(patient_id)
-    return jsonify(immunizations)
+    return patient_records_response(immunization_service, patient_id)
 
 @app.route('/api/patients/<int:patient_id>/immunizations', methods=['POST'])
 @login_required
@@ -510,8 +544,7 @@ def delete_immunization(immunization_id):
 @handle_database_error
 def get_appointments(patient_id):
     """Get all appointments for a patient"""
-    appointments = appointment_service.get_all(patient_id)
-    return jsonify(appointments)
+    return patient_records_response(appointment_service, patient_id)
 
 @app.route('/api/patients/<int:patient_id>/appointments', methods=['POST'])
 @login_required
@@ -1142,13 +1175,21 @@ def internal_error(error):
 
 def init_app():
     """Initialize the application"""
-    try:
+    # Under the debug reloader, the watcher process only restarts the server child, which
+    # runs init_app itself; opening the database here would just hold a second pool
+    if app_config.debug and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return
+    
+    def setup_database():
         # Initialize database
         initialize_database()
+        # Prepare the CRUD statements on every pooled connection before traffic arrives
+        warm_prepared_statements()
         logger.info("Application initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize application: {e}")
-        raise
+    
+    # Open every pooled connection up front in the process that serves requests, on a background
+    # thread so the server starts listening right away; requests wait until the database is ready
+    db.open_pool_in_background(setup_database)
 
 if __name__ == '__main__':
     init_app()
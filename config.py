@@ -23,6 +23,8 @@ class DatabaseConfig:
     max_overflow: int = int(os.getenv('DB_MAX_OVERFLOW', '20'))
     pool_timeout: int = int(os.getenv('DB_POOL_TIMEOUT', '30'))
     pool_recycle: int = int(os.getenv('DB_POOL_RECYCLE', '3600'))
+    prepare_statements: bool = os.getenv('DB_PREPARE_STATEMENTS', 'True').lower() == 'true'
+    prepared_cache_size: int = int(os.getenv('DB_PREPARED_CACHE_SIZE', '500'))
     
     @property
     def connection_string(self) -> str:
@@ -42,6 +44,8 @@ class AppConfig:
     host: str = os.getenv('APP_HOST', '0.0.0.0')
     port: int = int(os.getenv('APP_PORT', '5000'))
     session_timeout_hours: int = int(os.getenv('SESSION_TIMEOUT_HOURS', '8'))
+    cache_ttl_seconds: int = int(os.getenv('CACHE_TTL_SECONDS', '30'))
+    cache_max_entries: int = int(os.getenv('CACHE_MAX_ENTRIES', '10000'))
 
 # Global configuration instances
 db_config = DatabaseConfig()
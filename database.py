@@ -4,11 +4,19 @@ Implements secure connection pooling and CRUD operations
 """
 
 import psycopg2
-from psycopg2 import pool, sql
-from psycopg2.extras import RealDictCursor
+from psycopg2 import errors, pool, sql
+from psycopg2.extensions import connection as PGConnection
+from psycopg2.extras import RealDictCursor, execute_values
 import logging
+import hashlib
+import io
+import re
+import threading
+import uuid
+from collections import OrderedDict
 from contextlib import contextmanager
-from typing import List, Dict, Any, Optional, Union
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, Union, Iterator, Callable
 import json
 from datetime import datetime, date, time
 from config import db_config
@@ -20,6 +28,141 @@ class DatabaseError(Exception):
     """Custom exception for database operations"""
     pass
 
+# Insertable columns per table, in the order CRUD helpers supply values
+TABLE_COLUMNS = {
+    'patients': ('first_name', 'last_name', 'date_of_birth', 'gender', 'phone', 'email',
+                 'address', 'emergency_contact', 'insurance'),
+    'medications': ('patient_id', 'name', 'dosage', 'frequency', 'start_date', 'end_date',
+                    'prescribing_doctor', 'status'),
+    'conditions': ('patient_id', 'name', 'icd_code', 'status', 'date_diagnosed', 'severity'),
+    'diagnoses': ('patient_id', 'date', 'primary_diagnosis', 'secondary_diagnosis', 'provider', 'notes'),
+    'clinical_notes': ('patient_id', 'date', 'provider', 'type', 'note'),
+    'allergies': ('patient_id', 'allergen', 'reaction', 'severity', 'date_identified'),
+    'immunizations': ('patient_id', 'vaccine', 'date_administered', 'provider', 'lot_number'),
+    'appointments': ('patient_id', 'date', 'time', 'provider', 'type', 'status', 'notes')
+}
+
+# Columns stored as JSONB; plain-text values are kept as JSON strings, structured ones as objects
+JSONB_COLUMNS = {
+    'patients': ('emergency_contact', 'insurance')
+}
+
+# Secondary indexes created by EMRDatabase._create_indexes(), by name; indexes_deferred() drops exactly these
+SECONDARY_INDEXES = {
+    'idx_patients_name': "ON patients(first_name, last_name)",
+    # Containment lookups such as insurance @> '{"carrier": "Aetna"}'
+    'idx_patients_insurance': "ON patients USING gin (insurance jsonb_path_ops)",
+    # (patient_id, created_at DESC, id DESC) serves both patient lookups and keyset-paginated lists
+    'idx_medications_patient_created': "ON medications(patient_id, created_at DESC, id DESC)",
+    'idx_conditions_patient_created': "ON conditions(patient_id, created_at DESC, id DESC)",
+    'idx_diagnoses_patient_created': "ON diagnoses(patient_id, created_at DESC, id DESC)",
+    'idx_clinical_notes_patient_created': "ON clinical_notes(patient_id, created_at DESC, id DESC)",
+    'idx_allergies_patient_created': "ON allergies(patient_id, created_at DESC, id DESC)",
+    'idx_immunizations_patient_created': "ON immunizations(patient_id, created_at DESC, id DESC)",
+    'idx_appointments_patient_created': "ON appointments(patient_id, created_at DESC, id DESC)",
+    'idx_appointments_date': "ON appointments(date)",
+    # Partial indexes covering only live rows for the dashboard's "active items" lookups
+    'idx_med_active': "ON medications(patient_id) WHERE status = 'Active'",
+    'idx_cond_active': "ON conditions(patient_id) WHERE status = 'Active'",
+    'idx_appt_upcoming': "ON appointments(patient_id, date) WHERE status = 'Scheduled'"
+}
+
+# Trigram indexes let ILIKE '%term%' name searches use an index instead of a full scan; they need pg_trgm
+TRIGRAM_INDEXES = {
+    'idx_patients_first_name_trgm': "ON patients USING gin (first_name gin_trgm_ops)",
+    'idx_patients_last_name_trgm': "ON patients USING gin (last_name gin_trgm_ops)"
+}
+
+def _copy_text(value: Any) -> str:
+    """Encode a value as a COPY text-format field"""
+    if value is None:
+        return '\\N'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+class EMRConnection(PGConnection):
+    """
+    Pooled connection that remembers the server-side prepared statements of its session
+    Prepared statements live as long as the connection, so the registry does too
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # statement name -> True if prepared, False if PostgreSQL refused to prepare it,
+        # least recently used first
+        self.prepared: 'OrderedDict[str, bool]' = OrderedDict()
+        self._shared_cursor = None
+    
+    def remember_statement(self, cursor, name: str, prepared: bool):
+        """Record a statement, deallocating the least recently used ones beyond the cache size"""
+        self.prepared[name] = prepared
+        while len(self.prepared) > db_config.prepared_cache_size:
+            evicted, was_prepared = self.prepared.popitem(last=False)
+            if was_prepared:
+                cursor.execute(f"DEALLOCATE {evicted}")
+    
+    def forget_statement(self, cursor, name: str, deallocate: bool = True):
+        """Drop a statement from the registry so the next use prepares it again"""
+        if self.prepared.pop(name, False) and deallocate:
+            cursor.execute(f"DEALLOCATE {name}")
+    
+    def shared_cursor(self):
+        """
+        Return the long-lived cursor pinned to this connection, creating it on first use
+        The pool hands a connection to one thread at a time, so reuse is safe
+        """
+        if self._shared_cursor is None or self._shared_cursor.closed:
+            self._shared_cursor = self.cursor()
+        return self._shared_cursor
+
+# PREPARE errors that will recur for the same statement text; anything else is retried on the next use
+_UNPREPARABLE_ERRORS = (
+    errors.SyntaxError,
+    errors.IndeterminateDatatype,
+    errors.AmbiguousParameter
+)
+
+# EXECUTE errors after which the statement must be prepared afresh: the schema changed under
+# the cached plan ("cached plan must not change result type"), or the server no longer has it
+_STALE_STATEMENT_ERRORS = (
+    errors.FeatureNotSupported,
+    errors.InvalidSqlStatementName
+)
+
+# Statements PostgreSQL accepts in PREPARE
+_PREPARABLE_COMMANDS = {'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'VALUES'}
+_PLACEHOLDER_PATTERN = re.compile(r'%s|%%')
+
+@lru_cache(maxsize=512)
+def positional_query(query: str) -> Tuple[str, int]:
+    """Rewrite %s placeholders as PostgreSQL's $1, $2, ... and return (query, parameter count)"""
+    count = 0
+    
+    def number_placeholder(match):
+        nonlocal count
+        if match.group() == '%%':
+            return '%'
+        count += 1
+        return f"${count}"
+    
+    return _PLACEHOLDER_PATTERN.sub(number_placeholder, query), count
+
+@lru_cache(maxsize=512)
+def prepared_statement(query: str) -> Optional[Tuple[str, str, str, int]]:
+    """
+    Translate a %s-style query into a server-side prepared statement
+    Returns (name, PREPARE sql, EXECUTE template, parameter count),
+    or None when the query cannot be prepared (DDL, named parameters)
+    """
+    words = query.split(None, 1)
+    if not words or words[0].upper() not in _PREPARABLE_COMMANDS or '%(' in query:
+        return None
+    
+    body, count = positional_query(query)
+    name = f"q_{hashlib.blake2b(query.encode(), digest_size=8).hexdigest()}"
+    arguments = f"({', '.join(['%s'] * count)})" if count else ""
+    return name, f"PREPARE {name} AS {body}", f"EXECUTE {name}{arguments}", count
+
 class EMRDatabase:
     """
     PostgreSQL database manager for EMR system with connection pooling
@@ -27,28 +170,108 @@ class EMRDatabase:
     """
     
     def __init__(self):
-        """Initialize database connection pool"""
+        """Set up the statement templates; the connection pool opens on first use or open_pool()"""
         self.connection_pool = None
-        self._initialize_pool()
+        self._schemas = TABLE_COLUMNS
+        # INSERT templates are composed once here and rendered to text on first use
+        self._insert_sql = {
+            table: sql.SQL("INSERT INTO {} ({}) VALUES ({}) RETURNING id").format(
+                sql.Identifier(table),
+                sql.SQL(', ').join(map(sql.Identifier, columns)),
+                sql.SQL(', ').join(sql.Placeholder() * len(columns))
+            )
+            for table, columns in self._schemas.items()
+        }
+        self._pool_lock = threading.Lock()
+        # Cleared while open_pool_in_background() runs; set otherwise
+        self._pool_ready = threading.Event()
+        self._pool_ready.set()
+        self._pool_opener = None
+    
+    def _get_pool(self):
+        """
+        Return the connection pool, opening it on first use
+        Importing the module connects nothing, so scripts and worker processes only pay for
+        the connections they actually use. While open_pool_in_background() runs, callers on
+        other threads wait for it to finish.
+        """
+        if threading.current_thread() is not self._pool_opener:
+            if not self._pool_ready.wait(timeout=db_config.pool_timeout):
+                raise DatabaseError("Timed out waiting for database connection pool")
+        
+        if self.connection_pool is None:
+            with self._pool_lock:
+                if self.connection_pool is None:
+                    self._initialize_pool(pinned=False)
+        return self.connection_pool
+    
+    def open_pool(self):
+        """
+        Open every pooled connection up front and keep them for the life of the process,
+        so the prepared statements on each one keep paying off; for the app server only
+        Does nothing if the pool is already open
+        """
+        with self._pool_lock:
+            if self.connection_pool is None:
+                self._initialize_pool(pinned=True)
+        return self.connection_pool
+    
+    def open_pool_in_background(self, setup: Optional[Callable[[], Any]] = None):
+        """
+        Run open_pool() and then setup (schema creation, statement warm-up) on a daemon thread
+        Connecting to a remote server can take a while, so application startup doesn't block on it;
+        queries from other threads wait until both are done. Failures are logged, and later
+        queries open the pool on demand.
+        """
+        def run():
+            try:
+                self.open_pool()
+                if setup is not None:
+                    setup()
+            except Exception as e:
+                logger.error(f"Background database startup failed: {e}")
+            finally:
+                self._pool_ready.set()
+        
+        self._pool_ready.clear()
+        self._pool_opener = threading.Thread(target=run, name='emr-db-pool', daemon=True)
+        self._pool_opener.start()
     
-    def _initialize_pool(self):
-        """Initialize PostgreSQL connection pool with retry logic"""
+    def _initialize_pool(self, pinned: bool):
+        """
+        Initialize PostgreSQL connection pool
+        A pinned pool opens and keeps all connections; otherwise it starts with one and
+        closes connections beyond that as they are returned
+        """
         try:
+            # Room for request threads plus the services' chart fan-out workers
+            size = db_config.pool_size + db_config.max_overflow
             self.connection_pool = psycopg2.pool.ThreadedConnectionPool(
-                minconn=1,
-                maxconn=db_config.pool_size,
+                minconn=size if pinned else 1,
+                maxconn=size,
                 host=db_config.host,
                 port=db_config.port,
                 database=db_config.database,
                 user=db_config.username,
                 password=db_config.password,
-                cursor_factory=RealDictCursor
+                cursor_factory=RealDictCursor,
+                connection_factory=EMRConnection
             )
             logger.info("Database connection pool initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize database connection pool: {e}")
             raise DatabaseError(f"Database connection failed: {e}")
     
+    def insert_sql(self, table: str) -> str:
+        """Return the cached INSERT ... RETURNING id statement for a table"""
+        statement = self._insert_sql[table]
+        if not isinstance(statement, str):
+            # Identifier quoting needs a live connection, so render once and keep the text
+            with self.get_connection() as conn:
+                statement = statement.as_string(conn)
+            self._insert_sql[table] = statement
+        return statement
+    
     @contextmanager
     def get_connection(self):
         """
@@ -57,7 +280,7 @@ class EMRDatabase:
         """
         connection = None
         try:
-            connection = self.connection_pool.getconn()
+            connection = self._get_pool().getconn()
             if connection:
                 yield connection
             else:
@@ -71,34 +294,182 @@ class EMRDatabase:
             if connection:
                 self.connection_pool.putconn(connection)
     
-    def execute_query(self, query: str, params: tuple = None, fetch: bool = True) -> Optional[List[Dict]]:
+    def execute_query(self, query: str, params: tuple = None, fetch: bool = True,
+                      cursor_factory=None) -> Optional[List]:
         """
         Execute SQL query with parameterized inputs for security
         Args:
             query: SQL query string
             params: Query parameters (prevents SQL injection)
             fetch: Whether to fetch results
+            cursor_factory: Row type for callers that don't need dicts, e.g. NamedTupleCursor;
+                rows are returned exactly as that cursor builds them
         Returns:
             Query results or None
         """
         with self.get_connection() as conn:
-            with conn.cursor() as cursor:
+            cursor = conn.shared_cursor() if cursor_factory is None else conn.cursor(cursor_factory=cursor_factory)
+            try:
+                self._execute_prepared(conn, cursor, query, params)
+                conn.commit()
+                
+                if fetch:
+                    results = cursor.fetchall()
+                    if cursor_factory is not None:
+                        return results
+                    # Convert RealDictRow to regular dict for JSON serialization
+                    return [dict(row) for row in results] if results else []
+                return None
+                
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Query execution failed: {e}")
+                raise DatabaseError(f"Query failed: {e}")
+            finally:
+                if cursor_factory is not None:
+                    cursor.close()
+    
+    def execute_query_columnar(self, query: str, params: tuple = None) -> Dict[str, List]:
+        """
+        Execute a read query and return rows as tuples under a single column header
+        Avoids building a dict per row for large list results
+        Returns:
+            {"columns": [...], "rows": [(...), ...]}
+        """
+        with self.get_connection() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cursor:
                 try:
-                    cursor.execute(query, params)
+                    self._execute_prepared(conn, cursor, query, params)
                     conn.commit()
-                    
-                    if fetch:
-                        results = cursor.fetchall()
-                        # Convert RealDictRow to regular dict for JSON serialization
-                        return [dict(row) for row in results] if results else []
-                    return None
-                    
+                    return {
+                        'columns': [column.name for column in cursor.description],
+                        'rows': cursor.fetchall()
+                    }
                 except Exception as e:
                     conn.rollback()
-                    logger.error(f"Query execution failed: {e}")
+                    logger.error(f"Columnar query execution failed: {e}")
                     raise DatabaseError(f"Query failed: {e}")
     
-    def create_tables(self):
+    def iter_query(self, query: str, params: tuple = None, chunksize: int = 500) -> Iterator[Dict]:
+        """
+        Stream a read query's rows through a server-side cursor, fetching chunksize rows per round trip
+        Holds a pooled connection until the iterator is exhausted or closed
+        """
+        with self.get_connection() as conn:
+            try:
+                with conn.cursor(f"emr_stream_{uuid.uuid4().hex}") as cursor:
+                    cursor.itersize = chunksize
+                    cursor.execute(query, params)
+                    for row in cursor:
+                        yield dict(row)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Streaming query execution failed: {e}")
+                raise DatabaseError(f"Query failed: {e}")
+    
+    def _execute_prepared(self, conn, cursor, query: str, params: tuple = None):
+        """
+        Execute a query through a per-connection prepared statement
+        The first call on a connection issues PREPARE, later calls only EXECUTE,
+        so PostgreSQL parses and plans each distinct query once per session
+        """
+        statement = None
+        if db_config.prepare_statements and isinstance(query, str) and isinstance(params, (tuple, list, type(None))):
+            statement = prepared_statement(query)
+        
+        if statement is None or statement[3] != len(params or ()):
+            cursor.execute(query, params)
+            return
+        
+        if not self._prepare(conn, cursor, statement):
+            cursor.execute(query, params)
+            return
+        
+        try:
+            cursor.execute(statement[2], params)
+        except _STALE_STATEMENT_ERRORS as e:
+            # Prepare once more and retry; a second failure is a real error and propagates
+            conn.rollback()
+            logger.warning(f"Re-preparing statement {statement[0]}: {e}")
+            missing = isinstance(e, errors.InvalidSqlStatementName)
+            conn.forget_statement(cursor, statement[0], deallocate=not missing)
+            if self._prepare(conn, cursor, statement):
+                cursor.execute(statement[2], params)
+            else:
+                cursor.execute(query, params)
+    
+    def _prepare(self, conn, cursor, statement: Tuple[str, str, str, int]) -> bool:
+        """PREPARE a statement on conn unless it already was; returns whether the server accepted it"""
+        name, prepare_sql = statement[0], statement[1]
+        if name in conn.prepared:
+            conn.prepared.move_to_end(name)
+        else:
+            try:
+                cursor.execute(prepare_sql)
+                conn.remember_statement(cursor, name, True)
+            except psycopg2.Error as e:
+                # Fall back to plain execution; only statements the server can never prepare are
+                # remembered as such, other failures (e.g. a table not created yet) try again next time
+                conn.rollback()
+                logger.warning(f"Could not prepare statement {name}: {e}")
+                if not isinstance(e, _UNPREPARABLE_ERRORS):
+                    return False
+                conn.remember_statement(cursor, name, False)
+        return conn.prepared[name]
+    
+    def warm_connections(self, queries: List[str]) -> int:
+        """
+        PREPARE the given queries on every idle pooled connection before the first request needs them
+        Returns the number of connections warmed; connections in use prepare on first use as usual.
+        Only worthwhile on a pool from open_pool(), which keeps the warmed connections.
+        """
+        statements = [statement for statement in map(prepared_statement, queries) if statement is not None]
+        if not db_config.prepare_statements or not statements:
+            return 0
+        
+        connection_pool = self._get_pool()
+        connections = []
+        try:
+            for _ in range(connection_pool.maxconn):
+                try:
+                    connections.append(connection_pool.getconn())
+                except pool.PoolError:
+                    break
+            for conn in connections:
+                cursor = conn.shared_cursor()
+                for statement in statements:
+                    self._prepare(conn, cursor, statement)
+                conn.commit()
+        finally:
+            for conn in connections:
+                connection_pool.putconn(conn)
+        
+        logger.info(f"Prepared {len(statements)} statements on {len(connections)} connections")
+        return len(connections)
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Context manager yielding a single cursor for a multi-statement unit of work
+        All statements share one pooled connection and are committed together
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                yield cursor
+            conn.commit()
+    
+    def _execute(self, query: str, params: tuple = None, fetch: bool = False, cur=None) -> Optional[List[Dict]]:
+        """Run a statement on the supplied cursor, or through execute_query when none is given"""
+        if cur is None:
+            return self.execute_query(query, params, fetch=fetch)
+        
+        cur.execute(query, params)
+        if fetch:
+            return [dict(row) for row in cur.fetchall()]
+        return None
+    
+    def create_tables(self, cur=None):
         """Create all necessary tables for EMR system"""
         tables = {
             'patients': '''
@@ -111,8 +482,8 @@ class EMRDatabase:
                     phone VARCHAR(20),
                     email VARCHAR(100),
                     address TEXT,
-                    emergency_contact TEXT,
-                    insurance TEXT,
+                    emergency_contact JSONB,
+                    insurance JSONB,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
@@ -213,36 +584,72 @@ class EMRDatabase:
         # Create tables with proper error handling
         for table_name, create_sql in tables.items():
             try:
-                self.execute_query(create_sql, fetch=False)
+                self._execute(create_sql, cur=cur)
                 logger.info(f"Table '{table_name}' created/verified successfully")
             except Exception as e:
                 logger.error(f"Failed to create table '{table_name}': {e}")
                 raise DatabaseError(f"Table creation failed for {table_name}: {e}")
         
+        # Databases created while these columns were TEXT keep their values as JSON strings
+        self._execute("""
+            DO $$
+            BEGIN
+                IF (SELECT data_type FROM information_schema.columns
+                    WHERE table_schema = current_schema() AND table_name = 'patients'
+                      AND column_name = 'insurance') = 'text' THEN
+                    ALTER TABLE patients
+                        ALTER COLUMN emergency_contact TYPE JSONB USING to_jsonb(emergency_contact),
+                        ALTER COLUMN insurance TYPE JSONB USING to_jsonb(insurance);
+                END IF;
+            END $$
+        """, cur=cur)
+        
         # Create indexes for better performance
-        self._create_indexes()
+        self._create_indexes(cur)
     
-    def _create_indexes(self):
+    def _create_indexes(self, cur=None):
         """Create database indexes for better query performance"""
-        indexes = [
-            "CREATE INDEX IF NOT EXISTS idx_patients_name ON patients(first_name, last_name)",
-            "CREATE INDEX IF NOT EXISTS idx_medications_patient ON medications(patient_id)",
-            "CREATE INDEX IF NOT EXISTS idx_conditions_patient ON conditions(patient_id)",
-            "CREATE INDEX IF NOT EXISTS idx_diagnoses_patient ON diagnoses(patient_id)",
-            "CREATE INDEX IF NOT EXISTS idx_clinical_notes_patient ON clinical_notes(patient_id)",
-            "CREATE INDEX IF NOT EXISTS idx_allergies_patient ON allergies(patient_id)",
-            "CREATE INDEX IF NOT EXISTS idx_immunizations_patient ON immunizations(patient_id)",
-            "CREATE INDEX IF NOT EXISTS idx_appointments_patient ON appointments(patient_id)",
-            "CREATE INDEX IF NOT EXISTS idx_appointments_date ON appointments(date)"
-        ]
-        
-        for index_sql in indexes:
+        for name, definition in SECONDARY_INDEXES.items():
             try:
-                self.execute_query(index_sql, fetch=False)
+                self._execute(f"CREATE INDEX IF NOT EXISTS {name} {definition}", cur=cur)
             except Exception as e:
+                # A failed statement aborts a shared transaction, so it cannot be skipped
+                if cur is not None:
+                    raise
                 logger.warning(f"Index creation warning: {e}")
+        
+        # pg_trgm may be missing or need privileges; search still works without the trigram indexes
+        trigram_indexes = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+            f"CREATE INDEX IF NOT EXISTS {name} {definition}" for name, definition in TRIGRAM_INDEXES.items()
+        ]
+        
+        try:
+            if cur is not None:
+                cur.execute("SAVEPOINT trigram_indexes")
+            for index_sql in trigram_indexes:
+                self._execute(index_sql, cur=cur)
+            if cur is not None:
+                cur.execute("RELEASE SAVEPOINT trigram_indexes")
+        except Exception as e:
+            # Undo just this step so a shared transaction can still commit
+            if cur is not None:
+                cur.execute("ROLLBACK TO SAVEPOINT trigram_indexes")
+            logger.warning(f"Trigram search indexes not created: {e}")
+    
+    @contextmanager
+    def indexes_deferred(self, cur):
+        """
+        Drop the secondary indexes for the body of a bulk load on cur, then rebuild them
+        Building an index once over loaded rows is cheaper than updating it row by row;
+        use this only on emptied tables, where the rebuild has no existing rows to scan
+        """
+        # Only the indexes _create_indexes() rebuilds; any other index is left alone
+        for name in (*SECONDARY_INDEXES, *TRIGRAM_INDEXES):
+            cur.execute(sql.SQL("DROP INDEX IF EXISTS {}").format(sql.Identifier(name)))
+        yield cur
+        self._create_indexes(cur)
     
-    def insert_sample_data(self):
+    def insert_sample_data(self, cur=None):
         """Insert sample data for testing purposes"""
         # Insert sample patients
         patients_data = [
@@ -254,25 +661,89 @@ class EMRDatabase:
              'Aetna - Policy #AE789012')
         ]
         
-        for patient_data in patients_data:
-            try:
-                # Check if patient already exists
-                existing = self.execute_query(
-                    "SELECT id FROM patients WHERE first_name = %s AND last_name = %s AND date_of_birth = %s",
-                    (patient_data[0], patient_data[1], patient_data[2])
-                )
-                
-                if not existing:
-                    self.execute_query(
-                        """INSERT INTO patients (first_name, last_name, date_of_birth, gender, phone, email, 
-                           address, emergency_contact, insurance) 
-                           VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""",
-                        patient_data,
-                        fetch=False
-                    )
-                    logger.info(f"Sample patient {patient_data[0]} {patient_data[1]} inserted")
-            except Exception as e:
-                logger.warning(f"Failed to insert sample patient: {e}")
+        columns = self._schemas['patients']
+        # COPY takes the JSON text of the JSONB columns
+        json_positions = [columns.index(column) for column in JSONB_COLUMNS['patients']]
+        patients_data = [
+            tuple(json.dumps(value) if position in json_positions else value for position, value in enumerate(row))
+            for row in patients_data
+        ]
+        
+        try:
+            if cur is None:
+                with self.transaction() as tx_cur:
+                    inserted = self._load_sample_patients(tx_cur, columns, patients_data)
+            else:
+                inserted = self._load_sample_patients(cur, columns, patients_data)
+            logger.info(f"Inserted {inserted} sample patients")
+        except Exception as e:
+            if cur is not None:
+                raise
+            logger.warning(f"Failed to insert sample patients: {e}")
+    
+    def _load_sample_patients(self, cur, columns: tuple, rows: List[tuple]) -> int:
+        """
+        Stage sample patients with COPY and insert the ones not already present
+        Returns the number of patients inserted
+        """
+        column_list = sql.SQL(', ').join(map(sql.Identifier, columns))
+        cur.execute(
+            sql.SQL("CREATE TEMP TABLE sample_patients ON COMMIT DROP AS SELECT {} FROM patients WITH NO DATA")
+            .format(column_list)
+        )
+        self.copy_rows('sample_patients', columns, rows, cur=cur)
+        
+        cur.execute(sql.SQL("""
+            INSERT INTO patients ({columns})
+            SELECT {columns} FROM sample_patients s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM patients p
+                WHERE p.first_name = s.first_name AND p.last_name = s.last_name
+                  AND p.date_of_birth = s.date_of_birth
+            )
+        """).format(columns=column_list))
+        return cur.rowcount
+    
+    def insert_many(self, table: str, rows: List[tuple], page_size: int = 500, cur=None) -> List[int]:
+        """
+        Insert rows with multi-row INSERT ... VALUES ... RETURNING id statements
+        Rows hold values in TABLE_COLUMNS order; sends one statement per page_size rows.
+        Returns the new IDs in input order
+        """
+        if not rows:
+            return []
+        
+        statement = sql.SQL("INSERT INTO {} ({}) VALUES %s RETURNING id").format(
+            sql.Identifier(table),
+            sql.SQL(', ').join(map(sql.Identifier, self._schemas[table]))
+        )
+        
+        if cur is None:
+            with self.transaction() as tx_cur:
+                returned = execute_values(tx_cur, statement, rows, page_size=page_size, fetch=True)
+        else:
+            returned = execute_values(cur, statement, rows, page_size=page_size, fetch=True)
+        return [row['id'] for row in returned]
+    
+    def copy_rows(self, table: str, columns: tuple, rows: List[tuple], cur=None) -> None:
+        """
+        Bulk load rows into a table using COPY FROM STDIN
+        Much faster than row-by-row INSERT; None is loaded as NULL and '' stays an empty string
+        """
+        buffer = io.StringIO()
+        buffer.writelines('\t'.join(map(_copy_text, row)) + '\n' for row in rows)
+        buffer.seek(0)
+        
+        statement = sql.SQL("COPY {} ({}) FROM STDIN").format(
+            sql.Identifier(table),
+            sql.SQL(', ').join(map(sql.Identifier, columns))
+        )
+        
+        if cur is None:
+            with self.transaction() as tx_cur:
+                tx_cur.copy_expert(statement.as_string(tx_cur), buffer)
+        else:
+            cur.copy_expert(statement.as_string(cur), buffer)
     
     def close(self):
         """Close all database connections"""
@@ -294,8 +765,10 @@ def json_serializer(obj):
 def initialize_database():
     """Initialize database tables and sample data"""
     try:
-        db.create_tables()
-        db.insert_sample_data()
+        # Build schema and seed data on one connection with a single commit
+        with db.transaction() as cur:
+            db.create_tables(cur)
+            db.insert_sample_data(cur)
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Database initialization failed: {e}")
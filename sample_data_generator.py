@@ -0,0 +1,443 @@
+"""
+Sample patient data pools and generators for the EMR system
+Builds patients and their medical records in memory; nothing here touches the database,
+so generate_sample_data.py can run the batch generator in worker processes
+"""
+
+import random
+from datetime import date
+import numpy as np
+from numba import njit
+
+# Shared generator for vectorized draws
+rng = np.random.default_rng()
+
+# Private scalar generator for per-row picks, separate from the global `random` state;
+# reseeded in place, so the bound methods below stay valid
+py_rng = random.Random()
+_choice = py_rng.choice
+_randint = py_rng.randint
+
+# Proleptic ordinal of "today" that all generated dates are relative to
+_today_ordinal = date.today().toordinal()
+
+# Sample data pools
+FIRST_NAMES_MALE = [
+    'James', 'Robert', 'John', 'Michael', 'David', 'William', 'Richard', 'Charles', 'Joseph', 'Thomas',
+    'Christopher', 'Daniel', 'Paul', 'Mark', 'Donald', 'Steven', 'Andrew', 'Joshua', 'Kenneth', 'Kevin'
+]
+
+FIRST_NAMES_FEMALE = [
+    'Mary', 'Patricia', 'Jennifer', 'Linda', 'Elizabeth', 'Barbara', 'Susan', 'Jessica', 'Sarah', 'Karen',
+    'Lisa', 'Nancy', 'Betty', 'Helen', 'Sandra', 'Donna', 'Carol', 'Ruth', 'Sharon', 'Michelle'
+]
+
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+    'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin'
+]
+
+# Lowercase copies for email addresses, indexed like the display pools
+FIRST_NAMES_MALE_LOWER = tuple(name.lower() for name in FIRST_NAMES_MALE)
+FIRST_NAMES_FEMALE_LOWER = tuple(name.lower() for name in FIRST_NAMES_FEMALE)
+LAST_NAMES_LOWER = tuple(name.lower() for name in LAST_NAMES)
+
+CITIES = [
+    'New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix', 'Philadelphia', 'San Antonio', 'San Diego',
+    'Dallas', 'San Jose', 'Austin', 'Jacksonville', 'Fort Worth', 'Columbus', 'Charlotte', 'San Francisco',
+    'Indianapolis', 'Seattle', 'Denver', 'Washington DC'
+]
+
+STATES = [
+    'NY', 'CA', 'IL', 'TX', 'AZ', 'PA', 'FL', 'OH', 'NC', 'WA', 'CO', 'DC'
+]
+
+STREET_NAMES = ('Main', 'Oak', 'Pine', 'Elm', 'First', 'Second')
+
+STREET_SUFFIXES = ('St', 'Ave', 'Dr', 'Ln')
+
+CONTACT_FIRST_NAMES = tuple(FIRST_NAMES_MALE + FIRST_NAMES_FEMALE)
+
+INSURERS = ('BlueCross BlueShield', 'Aetna', 'Cigna', 'United Healthcare', 'Kaiser Permanente')
+
+POLICY_PREFIXES = ('BC', 'AE', 'CG', 'UH', 'KP')
+
+MEDICATIONS = [
+    {'name': 'Lisinopril', 'dosages': ['5mg', '10mg', '20mg'], 'frequencies': ['Once daily', 'Twice daily']},
+    {'name': 'Metformin', 'dosages': ['500mg', '850mg', '1000mg'], 'frequencies': ['Once daily', 'Twice daily']},
+    {'name': 'Atorvastatin', 'dosages': ['10mg', '20mg', '40mg'], 'frequencies': ['Once daily']},
+    {'name': 'Amlodipine', 'dosages': ['2.5mg', '5mg', '10mg'], 'frequencies': ['Once daily']},
+    {'name': 'Omeprazole', 'dosages': ['20mg', '40mg'], 'frequencies': ['Once daily', 'Twice daily']},
+    {'name': 'Hydrochlorothiazide', 'dosages': ['12.5mg', '25mg'], 'frequencies': ['Once daily']},
+    {'name': 'Aspirin', 'dosages': ['81mg', '325mg'], 'frequencies': ['Once daily']},
+    {'name': 'Levothyroxine', 'dosages': ['25mcg', '50mcg', '75mcg', '100mcg'], 'frequencies': ['Once daily']},
+    {'name': 'Sertraline', 'dosages': ['25mg', '50mg', '100mg'], 'frequencies': ['Once daily']},
+    {'name': 'Losartan', 'dosages': ['25mg', '50mg', '100mg'], 'frequencies': ['Once daily']}
+]
+
+CONDITIONS = [
+    {'name': 'Hypertension', 'icd_code': 'I10', 'severities': ['Mild', 'Moderate', 'Severe']},
+    {'name': 'Type 2 Diabetes', 'icd_code': 'E11', 'severities': ['Controlled', 'Moderate', 'Severe']},
+    {'name': 'Hyperlipidemia', 'icd_code': 'E78.5', 'severities': ['Mild', 'Moderate', 'Severe']},
+    {'name': 'Obesity', 'icd_code': 'E66.9', 'severities': ['Mild', 'Moderate', 'Severe']},
+    {'name': 'Depression', 'icd_code': 'F32.9', 'severities': ['Mild', 'Moderate', 'Severe']},
+    {'name': 'Asthma', 'icd_code': 'J45.9', 'severities': ['Mild', 'Moderate', 'Severe']},
+    {'name': 'Hypothyroidism', 'icd_code': 'E03.9', 'severities': ['Mild', 'Moderate']},
+    {'name': 'Osteoarthritis', 'icd_code': 'M19.9', 'severities': ['Mild', 'Moderate', 'Severe']},
+    {'name': 'GERD', 'icd_code': 'K21.9', 'severities': ['Mild', 'Moderate', 'Severe']},
+    {'name': 'Anxiety Disorder', 'icd_code': 'F41.9', 'severities': ['Mild', 'Moderate', 'Severe']}
+]
+
+ALLERGIES = [
+    {'allergen': 'Penicillin', 'reactions': ['Rash', 'Hives', 'Swelling'], 'severities': ['Mild', 'Moderate', 'Severe']},
+    {'allergen': 'Shellfish', 'reactions': ['Swelling', 'Difficulty breathing', 'Anaphylaxis'], 'severities': ['Moderate', 'Severe']},
+    {'allergen': 'Latex', 'reactions': ['Contact dermatitis', 'Rash'], 'severities': ['Mild', 'Moderate']},
+    {'allergen': 'Sulfa drugs', 'reactions': ['Rash', 'Nausea'], 'severities': ['Mild', 'Moderate']},
+    {'allergen': 'Nuts', 'reactions': ['Swelling', 'Breathing difficulty'], 'severities': ['Moderate', 'Severe']},
+    {'allergen': 'Iodine', 'reactions': ['Rash', 'Swelling'], 'severities': ['Mild', 'Moderate']},
+    {'allergen': 'Eggs', 'reactions': ['Hives', 'Digestive issues'], 'severities': ['Mild', 'Moderate']},
+    {'allergen': 'Dust mites', 'reactions': ['Sneezing', 'Congestion'], 'severities': ['Mild']},
+    {'allergen': 'Pollen', 'reactions': ['Sneezing', 'Itchy eyes'], 'severities': ['Mild', 'Moderate']},
+    {'allergen': 'Codeine', 'reactions': ['Nausea', 'Dizziness'], 'severities': ['Mild', 'Moderate']}
+]
+
+VACCINES = [
+    {'vaccine': 'COVID-19', 'lot_prefixes': ['CV', 'PF', 'MD']},
+    {'vaccine': 'Influenza', 'lot_prefixes': ['FL', 'IN', 'FU']},
+    {'vaccine': 'Tetanus', 'lot_prefixes': ['TT', 'TD', 'TP']},
+    {'vaccine': 'Pneumonia', 'lot_prefixes': ['PN', 'PC', 'PP']},
+    {'vaccine': 'Shingles', 'lot_prefixes': ['SH', 'ZO', 'HZ']},
+    {'vaccine': 'Hepatitis B', 'lot_prefixes': ['HB', 'HP', 'HE']},
+    {'vaccine': 'MMR', 'lot_prefixes': ['MM', 'MR', 'MS']},
+    {'vaccine': 'HPV', 'lot_prefixes': ['HP', 'GR', 'CV']}
+]
+
+def ragged_choices(pool, field):
+    """
+    Flatten one list-valued field of a pool into struct-of-arrays form
+    Returns (values, idx, lengths): idx[item, :lengths[item]] are the item's options as indexes into values
+    """
+    values = tuple(dict.fromkeys(option for entry in pool for option in entry[field]))
+    lookup = {option: k for k, option in enumerate(values)}
+    lengths = np.array([len(entry[field]) for entry in pool], dtype=np.int8)
+    idx = np.zeros((len(pool), lengths.max()), dtype=np.int8)
+    for item, entry in enumerate(pool):
+        idx[item, :lengths[item]] = [lookup[option] for option in entry[field]]
+    return values, idx, lengths
+
+# Struct-of-arrays views of the pools, indexed by pool position
+CONDITION_NAMES = tuple(condition['name'] for condition in CONDITIONS)
+CONDITION_ICD_CODES = tuple(condition['icd_code'] for condition in CONDITIONS)
+CONDITION_SEVERITIES = ragged_choices(CONDITIONS, 'severities')
+
+MEDICATION_NAMES = tuple(medication['name'] for medication in MEDICATIONS)
+MEDICATION_DOSAGES = ragged_choices(MEDICATIONS, 'dosages')
+MEDICATION_FREQUENCIES = ragged_choices(MEDICATIONS, 'frequencies')
+
+ALLERGENS = tuple(allergy['allergen'] for allergy in ALLERGIES)
+ALLERGY_REACTIONS = ragged_choices(ALLERGIES, 'reactions')
+ALLERGY_SEVERITIES = ragged_choices(ALLERGIES, 'severities')
+
+VACCINE_NAMES = tuple(vaccine['vaccine'] for vaccine in VACCINES)
+VACCINE_LOT_PREFIXES = ragged_choices(VACCINES, 'lot_prefixes')
+
+# Pools sampled without replacement per patient: (record key, pool, min count, max count)
+SAMPLED_POOLS = (
+    ('conditions', CONDITIONS, 1, 4),
+    ('medications', MEDICATIONS, 1, 5),
+    ('allergies', ALLERGIES, 0, 3),
+    ('vaccines', VACCINES, 2, 6)
+)
+POOL_SIZES = np.array([len(pool) for _, pool, _, _ in SAMPLED_POOLS], dtype=np.int64)
+POOL_MIN_COUNTS = np.array([low for _, _, low, _ in SAMPLED_POOLS], dtype=np.int64)
+POOL_MAX_COUNTS = np.array([high for _, _, _, high in SAMPLED_POOLS], dtype=np.int64)
+
+# Batch size from which the Numba-compiled sampler beats its compile/load overhead
+JIT_MIN_BATCH = 10000
+
+PROVIDERS = [
+    'Dr. Smith', 'Dr. Johnson', 'Dr. Williams', 'Dr. Brown', 'Dr. Jones',
+    'Dr. Garcia', 'Dr. Miller', 'Dr. Davis', 'Dr. Rodriguez', 'Dr. Martinez',
+    'Dr. Wilson', 'Dr. Anderson', 'Dr. Taylor', 'Dr. Thomas', 'Dr. Moore'
+]
+
+APPOINTMENT_TYPES = [
+    'Annual Physical', 'Follow-up', 'Consultation', 'Urgent Care', 'Specialist Referral',
+    'Lab Review', 'Procedure', 'Screening', 'Preventive Care', 'Chronic Care Management'
+]
+
+APPOINTMENT_STATUSES = ['Scheduled', 'Completed', 'Cancelled', 'No-show']
+
+NOTE_TYPES = ['Progress Note', 'Consultation', 'Assessment', 'Discharge Summary', 'History']
+
+# Phrase pools for the free-text columns
+DIAGNOSIS_PROGRESS = ('improvement', 'stable condition', 'good response to treatment')
+NOTE_FEELINGS = ('well', 'better', 'stable', 'improved')
+NOTE_PLANS = ('Continue current medications', 'Adjusting dosage as needed', 'Monitoring closely', 'No changes to treatment plan')
+NOTE_MEASURES = ('Blood pressure', 'Blood sugar', 'Cholesterol levels', 'Vital signs')
+NOTE_MEASURE_STATES = ('stable', 'improving', 'within normal range', 'well controlled')
+NOTE_ADHERENCE = ('Patient compliant with medication', 'Good adherence to treatment', 'Following dietary recommendations')
+NOTE_FOLLOW_UPS = ('in 3 months', 'in 6 months', 'as needed', 'in 1 month')
+NOTE_NEXT_STEPS = ('Continue monitoring', 'Lab work ordered', 'Referral discussed', 'Patient education provided')
+PAST_APPOINTMENT_STATUSES = ('Completed', 'Cancelled', 'No-show')
+APPOINTMENT_MINUTES = ('00', '15', '30', '45')
+APPOINTMENT_REASONS = ('routine care', 'follow-up', 'assessment', 'monitoring')
+
+# Clinical note templates and the phrase pools that fill their %s slots
+NOTE_TEMPLATES = (
+    ("Patient reports feeling %s. %s.", (NOTE_FEELINGS, NOTE_PLANS)),
+    ("%s %s. %s.", (NOTE_MEASURES, NOTE_MEASURE_STATES, NOTE_ADHERENCE)),
+    ("Follow-up %s. %s.", (NOTE_FOLLOW_UPS, NOTE_NEXT_STEPS))
+)
+
+def seed_generators(seed):
+    """Seed the numpy and stdlib generators for a reproducible run"""
+    global rng
+    rng = np.random.default_rng(seed)
+    py_rng.seed(seed)
+
+def refresh_date_anchor():
+    """Read today's date once per run so the date helpers don't call datetime.now() per value"""
+    global _today_ordinal
+    _today_ordinal = date.today().toordinal()
+
+def generate_recent_date(max_days_ago=365):
+    """Generate a recent date within specified days"""
+    return date.fromordinal(_today_ordinal - _randint(1, max_days_ago))
+
+def generate_future_date(max_days_ahead=180):
+    """Generate a future date for appointments"""
+    return date.fromordinal(_today_ordinal + _randint(1, max_days_ahead))
+
+@njit(cache=True)
+def _draw_sample_indices(n, seed, pool_sizes, min_counts, max_counts):
+    """
+    Draw per-patient record counts and pool indices without replacement
+    Returns counts[n, pools] and choices[n, pools, max_count]; unused slots hold -1
+    """
+    np.random.seed(seed)
+    num_pools = pool_sizes.shape[0]
+    counts = np.empty((n, num_pools), np.int64)
+    choices = np.full((n, num_pools, max_counts.max()), -1, np.int64)
+    scratch = np.empty(pool_sizes.max(), np.int64)
+    
+    for i in range(n):
+        for p in range(num_pools):
+            k = np.random.randint(min_counts[p], max_counts[p] + 1)
+            counts[i, p] = k
+            size = pool_sizes[p]
+            for j in range(size):
+                scratch[j] = j
+            # Partial Fisher-Yates: the first k slots become a uniform sample
+            for j in range(k):
+                r = np.random.randint(j, size)
+                scratch[j], scratch[r] = scratch[r], scratch[j]
+                choices[i, p, j] = scratch[j]
+    
+    return counts, choices
+
+def _sample_idx(n, k, rng):
+    """Floyd's algorithm: k distinct indices from range(n) using exactly k draws"""
+    chosen = []
+    for j in range(n - k, n):
+        t = int(rng.integers(0, j + 1))
+        chosen.append(j if t in chosen else t)
+    return chosen
+
+def draw_pool_samples(n, rng):
+    """
+    Pick the condition/medication/allergy/vaccine indices for n patients from rng
+    Returns one list of index sequences per patient, in SAMPLED_POOLS order.
+    Large batches use the compiled sampler; small ones skip the JIT start-up cost.
+    """
+    if n >= JIT_MIN_BATCH:
+        counts, choices = _draw_sample_indices(
+            n, int(rng.integers(0, 2**31 - 1)), POOL_SIZES, POOL_MIN_COUNTS, POOL_MAX_COUNTS
+        )
+        return [
+            [choices[i, p, :counts[i, p]] for p in range(len(SAMPLED_POOLS))]
+            for i in range(n)
+        ]
+    
+    counts = rng.integers(POOL_MIN_COUNTS, POOL_MAX_COUNTS + 1, size=(n, len(SAMPLED_POOLS)))
+    return [
+        [_sample_idx(int(POOL_SIZES[p]), int(counts[i, p]), rng) for p in range(len(SAMPLED_POOLS))]
+        for i in range(n)
+    ]
+
+def pick_options(choices, items):
+    """Pick one option per pool item from a ragged_choices() table in a single vectorized draw"""
+    values, idx, lengths = choices
+    picks = idx[items, rng.integers(0, lengths[items])]
+    return [values[k] for k in picks]
+
+def format_phone(parts):
+    """Format three drawn integers as a phone number"""
+    return f"({parts[0]}) {parts[1]}-{parts[2]}"
+
+def generate_patient_data_batch(num_patients, rng):
+    """
+    Generate comprehensive data for a batch of patients from the generator rng
+    Every random pick is drawn for the whole batch in one vectorized numpy call
+    """
+    n = num_patients
+    
+    # Demographics
+    is_male = rng.integers(0, 2, size=n).astype(bool)
+    first_idx = rng.integers(0, np.where(is_male, len(FIRST_NAMES_MALE), len(FIRST_NAMES_FEMALE)))
+    last_idx = rng.integers(0, len(LAST_NAMES), size=n)
+    ages = rng.integers(18, 86, size=n)  # Age between 18 and 85
+    # Date of birth somewhere in the year that makes each patient ages[i] years old today
+    birth_ordinals = _today_ordinal - 365 * ages - rng.integers(0, 365, size=n)
+    city_idx = rng.integers(0, len(CITIES), size=n)
+    state_idx = rng.integers(0, len(STATES), size=n)
+    # Patient and emergency-contact phone numbers: (area, exchange, line)
+    phones = rng.integers([200, 200, 1000], [1000, 1000, 10000], size=(n, 2, 3))
+    house_numbers = rng.integers(100, 10000, size=n)
+    street_idx = rng.integers(0, len(STREET_NAMES), size=n)
+    suffix_idx = rng.integers(0, len(STREET_SUFFIXES), size=n)
+    zip_codes = rng.integers(10000, 100000, size=n)
+    contact_idx = rng.integers(0, len(CONTACT_FIRST_NAMES), size=n)
+    insurer_idx = rng.integers(0, len(INSURERS), size=n)
+    policy_prefix_idx = rng.integers(0, len(POLICY_PREFIXES), size=n)
+    policy_numbers = rng.integers(100000, 1000000, size=n)
+    
+    # Medical data: which pool entries each patient gets
+    sampled = draw_pool_samples(n, rng)
+    
+    patients = []
+    for i in range(n):
+        gender = 'Male' if is_male[i] else 'Female'
+        first_name = (FIRST_NAMES_MALE if is_male[i] else FIRST_NAMES_FEMALE)[first_idx[i]]
+        last_name = LAST_NAMES[last_idx[i]]
+        first_lower = (FIRST_NAMES_MALE_LOWER if is_male[i] else FIRST_NAMES_FEMALE_LOWER)[first_idx[i]]
+        last_lower = LAST_NAMES_LOWER[last_idx[i]]
+        
+        # Pick every token first so each string is a single format over locals
+        street = STREET_NAMES[street_idx[i]]
+        suffix = STREET_SUFFIXES[suffix_idx[i]]
+        city = CITIES[city_idx[i]]
+        state = STATES[state_idx[i]]
+        contact = CONTACT_FIRST_NAMES[contact_idx[i]]
+        insurer = INSURERS[insurer_idx[i]]
+        policy_prefix = POLICY_PREFIXES[policy_prefix_idx[i]]
+        
+        demographics = {
+            'first_name': first_name,
+            'last_name': last_name,
+            'date_of_birth': date.fromordinal(int(birth_ordinals[i])),
+            'gender': gender,
+            'phone': format_phone(phones[i, 0]),
+            'email': f"{first_lower}.{last_lower}@email.com",
+            'address': f"{house_numbers[i]} {street} {suffix}, {city}, {state} {zip_codes[i]}",
+            'emergency_contact': f"{contact} {last_name} - {format_phone(phones[i, 1])}",
+            'insurance': f"{insurer} - Policy #{policy_prefix}{policy_numbers[i]}"
+        }
+        
+        # Medical data is kept as index arrays into the struct-of-arrays pools
+        patient = {'demographics': demographics}
+        for p, (key, _, _, _) in enumerate(SAMPLED_POOLS):
+            patient[key] = sampled[i][p]
+        patients.append(patient)
+    
+    return patients
+
+def generate_chunk(chunk_size, seed_sequence):
+    """
+    Build one chunk of patients from its own SeedSequence; the worker process entry point
+    The shared generators are left alone, so this is also safe to call next to other draws
+    """
+    return generate_patient_data_batch(chunk_size, np.random.default_rng(seed_sequence))
+
+def build_medical_rows(patient_id, patient_data):
+    """Build the child-table rows for one patient, keyed by table name"""
+    conditions = patient_data['conditions']
+    medications = patient_data['medications']
+    allergies = patient_data['allergies']
+    vaccines = patient_data['vaccines']
+    
+    condition_rows = [
+        (patient_id, CONDITION_NAMES[c], CONDITION_ICD_CODES[c], 'Active',
+         generate_recent_date(1825),  # Within last 5 years
+         severity)
+        for c, severity in zip(conditions, pick_options(CONDITION_SEVERITIES, conditions))
+    ]
+    
+    medication_rows = [
+        (patient_id, MEDICATION_NAMES[m], dosage, frequency,
+         generate_recent_date(730),  # Within last 2 years
+         _choice(PROVIDERS), 'Active')
+        for m, dosage, frequency in zip(medications,
+                                        pick_options(MEDICATION_DOSAGES, medications),
+                                        pick_options(MEDICATION_FREQUENCIES, medications))
+    ]
+    
+    allergy_rows = [
+        (patient_id, ALLERGENS[a], reaction, severity,
+         generate_recent_date(3650))  # Within last 10 years
+        for a, reaction, severity in zip(allergies,
+                                         pick_options(ALLERGY_REACTIONS, allergies),
+                                         pick_options(ALLERGY_SEVERITIES, allergies))
+    ]
+    
+    immunization_rows = [
+        (patient_id, VACCINE_NAMES[v],
+         generate_recent_date(1095),  # Within last 3 years
+         _choice(PROVIDERS),
+         f"{lot_prefix}{_randint(100000, 999999)}")
+        for v, lot_prefix in zip(vaccines, pick_options(VACCINE_LOT_PREFIXES, vaccines))
+    ]
+    
+    diagnosis_rows = []
+    num_diagnoses = _randint(1, 3)
+    for _ in range(num_diagnoses):
+        diagnosis_date = generate_recent_date(365)
+        primary_diagnosis = CONDITION_NAMES[_choice(conditions)]
+        secondary_diagnosis = _choice(['', CONDITION_NAMES[_choice(conditions)]])
+        if secondary_diagnosis == primary_diagnosis:
+            secondary_diagnosis = ''
+        
+        diagnosis_rows.append(
+            (patient_id, diagnosis_date, primary_diagnosis, secondary_diagnosis,
+             _choice(PROVIDERS), "Patient showing %s with current treatment plan." % _choice(DIAGNOSIS_PROGRESS))
+        )
+    
+    note_rows = []
+    num_notes = _randint(2, 5)
+    for _ in range(num_notes):
+        note_date = generate_recent_date(365)
+        note_type = _choice(NOTE_TYPES)
+        # Choose the template first so only the note that is kept gets built
+        template, phrase_pools = _choice(NOTE_TEMPLATES)
+        note = template % tuple(_choice(phrases) for phrases in phrase_pools)
+        
+        note_rows.append((patient_id, note_date, _choice(PROVIDERS), note_type, note))
+    
+    appointment_rows = []
+    num_appointments = _randint(2, 4)
+    for _ in range(num_appointments):
+        # Mix of past and future appointments
+        if _choice([True, False]):
+            appt_date = generate_recent_date(180)  # Past appointment
+            status = _choice(PAST_APPOINTMENT_STATUSES)
+        else:
+            appt_date = generate_future_date(180)  # Future appointment
+            status = 'Scheduled'
+        
+        appt_time = "%d:%s" % (_randint(8, 17), _choice(APPOINTMENT_MINUTES))
+        appt_type = _choice(APPOINTMENT_TYPES)
+        
+        appointment_rows.append(
+            (patient_id, appt_date, appt_time, _choice(PROVIDERS),
+             appt_type, status, "%s appointment for %s" % (appt_type, _choice(APPOINTMENT_REASONS)))
+        )
+    
+    return {
+        'conditions': condition_rows,
+        'medications': medication_rows,
+        'allergies': allergy_rows,
+        'immunizations': immunization_rows,
+        'diagnoses': diagnosis_rows,
+        'clinical_notes': note_rows,
+        'appointments': appointment_rows
+    }
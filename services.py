@@ -3,567 +3,653 @@ CRUD service classes for EMR system
 Implements secure database operations for all patient data sections
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Sequence, Iterator, Tuple
 from datetime import datetime, date
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from operator import itemgetter
+import copy
 import logging
-from database import db, DatabaseError
-import pdb
+import threading
+import time
+from config import app_config
+from psycopg2.extras import Json, NamedTupleCursor
+from database import db, DatabaseError, TABLE_COLUMNS, JSONB_COLUMNS
 
 logger = logging.getLogger(__name__)
 
+_MISSING = object()
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire a fixed time after being stored
+    A ttl of 0 disables caching. Every invalidation bumps a generation counter, so a read
+    that started before a write can skip caching the stale rows it loaded.
+    """
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: 'OrderedDict[tuple, tuple]' = OrderedDict()
+        self._lock = threading.RLock()
+        self._generation = 0
+    
+    def generation(self) -> int:
+        """Current invalidation generation; read it before loading a value to set()"""
+        return self._generation
+    
+    def get(self, key: tuple) -> Any:
+        """Return the cached value, or _MISSING when absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key: tuple, value: Any, generation: Optional[int] = None):
+        """
+        Store a value, evicting the least recently used entries beyond maxsize
+        With generation, nothing is stored if an invalidation ran since it was read
+        """
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def pop(self, key: tuple):
+        """Drop one entry if present"""
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(key, None)
+    
+    def discard_where(self, predicate: Callable[[tuple], bool]):
+        """Drop every entry whose key matches predicate"""
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+# Rows per get_all page unless the caller asks for another limit (None = no limit)
+DEFAULT_PAGE_SIZE = 50
+
+# Read-through cache for get_all/get_by_id, keyed by (table, 'patient' | 'id', id[, projection, page]),
+# plus full charts under ('patients', 'chart', patient_id). Cached rows are read-only: services return
+# copies and never the cached objects themselves. Writes invalidate it in this process
+# only; other processes serve their copies until the TTL expires.
+record_cache = TTLCache(maxsize=app_config.cache_max_entries, ttl=app_config.cache_ttl_seconds)
+
+class SingleFlight:
+    """
+    Collapse concurrent calls that share a key into one execution
+    Callers arriving while the first is still running wait for and share its result
+    """
+    
+    def __init__(self):
+        self._calls: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key: tuple, fn: Callable[[], Any]) -> Any:
+        """Return fn(), or the result of the identical call already in flight"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+        
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+# In-flight single-row reads, keyed like record_cache, so a cache miss under load costs one query
+inflight = SingleFlight()
+
+def _load_one(key: tuple, query: str, params: tuple) -> Optional[Dict[str, Any]]:
+    """
+    Fetch the first row of query (or None) through inflight and cache it under key
+    The row is not cached if a write invalidated the cache while it loaded. Invalidation
+    only reaches this process's cache; other processes keep their copy until the TTL.
+    """
+    def load():
+        generation = record_cache.generation()
+        results = db.execute_query(query, params)
+        row = results[0] if results else None
+        record_cache.set(key, row, generation)
+        return row
+    return inflight.do(key, load)
+
+def _copy_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fresh row dicts for a caller, so mutating them can't change what record_cache serves next"""
+    return [dict(row) for row in rows]
+
+def _cache_id(value: Any) -> Any:
+    """Normalize IDs so 5 and '5' share a cache entry"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
 class BaseService:
     """Base service class with common CRUD operations"""
     
-    def __init__(self, table_name: str):
+    # Values create() substitutes for missing fields, applied the same way by create_many()
+    column_defaults: Dict[str, Any] = {}
+    
+    # Columns get_all() returns unless asked for others; None selects every column
+    DEFAULT_COLUMNS: Optional[tuple] = None
+    
+    def __init__(self, table_name: str, record_label: str):
         self.table_name = table_name
+        # Singular record name for log and error messages
+        self.record_label = record_label
+        
+        # Column lists and write statements are built once per service, not on every call
+        self._insert_columns = TABLE_COLUMNS[table_name]
+        self._json_columns = JSONB_COLUMNS.get(table_name, ())
+        # Sub-records never move to another patient, so updates leave patient_id alone
+        self._update_columns = tuple(column for column in self._insert_columns if column != 'patient_id')
+        self._update_sql = (
+            f"UPDATE {table_name} SET {', '.join(f'{column} = %s' for column in self._update_columns)}, "
+            f"updated_at = CURRENT_TIMESTAMP WHERE id = %s"
+        )
+        # upsert() statements: new records take their id from the sequence, existing ones are
+        # updated in place, so a caller-supplied id never gets ahead of the sequence
+        self._insert_returning_sql = (
+            f"INSERT INTO {table_name} ({', '.join(self._insert_columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(self._insert_columns))}) RETURNING *"
+        )
+        self._update_returning_sql = f"{self._update_sql} RETURNING *"
+        self._get_by_id_sql = f"SELECT * FROM {table_name} WHERE id = %s"
+        # Every selectable column name, for validating caller-supplied names before they reach SQL
+        self._known_columns = frozenset(('id', 'created_at', 'updated_at') + self._insert_columns)
+        # Condition key tuple -> (WHERE fragment, parameter getter), filled by where_for()
+        self._where_templates: Dict[tuple, tuple] = {}
+    
+    def where_for(self, keys: Sequence[str]) -> Tuple[str, Callable[[Dict[str, Any]], tuple]]:
+        """
+        Return the WHERE fragment for equality conditions on keys and a function extracting its parameters
+        Each key combination is assembled once and reused on later calls
+        """
+        keys = tuple(keys)
+        template = self._where_templates.get(keys)
+        if template is None:
+            unknown = [key for key in keys if key not in self._known_columns]
+            if unknown:
+                raise ValueError(f"Unknown {self.table_name} columns: {', '.join(unknown)}")
+            clause = " WHERE " + " AND ".join(f"{key} = %s" for key in keys)
+            # itemgetter returns a bare value rather than a 1-tuple for a single key
+            getter = itemgetter(*keys) if len(keys) > 1 else (lambda values, key=keys[0]: (values[key],))
+            template = self._where_templates[keys] = (clause, getter)
+        return template
     
     def _format_where_clause(self, conditions: Dict[str, Any]) -> tuple:
         """Format WHERE clause with parameters for safe SQL execution"""
         if not conditions:
             return "", ()
         
-        where_parts = []
-        params = []
-        
-        for key, value in conditions.items():
-            where_parts.append(f"{key} = %s")
-            params.append(value)
-        
-        where_clause = " WHERE " + " AND ".join(where_parts)
-        return where_clause, tuple(params)
+        where_clause, params = self.where_for(tuple(conditions))
+        return where_clause, params(conditions)
+    
+    def _projection(self, columns: Optional[Sequence[str]]) -> str:
+        """Build the SELECT list for get_all, accepting only this table's column names"""
+        columns = columns or self.DEFAULT_COLUMNS
+        if not columns:
+            return "*"
+        
+        unknown = [column for column in columns if column not in self._known_columns]
+        if unknown:
+            raise ValueError(f"Unknown {self.table_name} columns: {', '.join(unknown)}")
+        return ", ".join(columns)
+    
+    def _page_query(self, projection: str, patient_id: int, limit: Optional[int],
+                    before: Optional[datetime], before_id: Optional[int]) -> tuple:
+        """
+        Build the keyset-paginated SELECT for a patient's records, newest first
+        Rows sort by (created_at, id) so records sharing a timestamp are neither skipped nor repeated
+        """
+        if before is None:
+            keyset, params = "", (patient_id,)
+        elif before_id is None:
+            keyset, params = " AND created_at < %s::timestamp", (patient_id, before)
+        else:
+            keyset, params = " AND (created_at, id) < (%s::timestamp, %s::int)", (patient_id, before, before_id)
+        
+        query = (f"SELECT {projection} FROM {self.table_name} WHERE patient_id = %s{keyset} "
+                 f"ORDER BY created_at DESC, id DESC LIMIT %s")
+        return query, params + (limit,)
+    
+    def get_all(self, patient_id: int, columns: Optional[Sequence[str]] = None,
+                limit: Optional[int] = DEFAULT_PAGE_SIZE, before: Optional[datetime] = None,
+                before_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get one page of a patient's records, limited to columns (default: DEFAULT_COLUMNS)
+        For the next page pass the last row's created_at as before and its id as before_id
+        """
+        projection = self._projection(columns)
+        key = (self.table_name, 'patient', _cache_id(patient_id), projection, limit, before, before_id)
+        cached = record_cache.get(key)
+        if cached is not _MISSING:
+            return _copy_rows(cached)
+        
+        query, params = self._page_query(projection, patient_id, limit, before, before_id)
+        generation = record_cache.generation()
+        try:
+            results = db.execute_query(query, params)
+            record_cache.set(key, results, generation)
+            return _copy_rows(results)
+        except Exception as e:
+            logger.error("Failed to get all %s for patient %s: %s", self.table_name, patient_id, e)
+            raise DatabaseError(f"Failed to retrieve {self.table_name}")
+    
+    async def get_all_async(self, patient_id: int, columns: Optional[Sequence[str]] = None,
+                            limit: Optional[int] = DEFAULT_PAGE_SIZE, before: Optional[datetime] = None,
+                            before_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        get_all() on the asyncpg pool; synchronous callers can use adb.run(service.get_all_async(...))
+        asyncpg doesn't coerce parameter types the way psycopg2's text substitution does, so ids are
+        converted to int here and before must be a datetime, not a string
+        """
+        # Imported here so the sync app and scripts don't need asyncpg to import services
+        from adb import adb
+        
+        patient_id = int(patient_id)
+        if before_id is not None:
+            before_id = int(before_id)
+        projection = self._projection(columns)
+        key = (self.table_name, 'patient', _cache_id(patient_id), projection, limit, before, before_id)
+        cached = record_cache.get(key)
+        if cached is not _MISSING:
+            return _copy_rows(cached)
+        
+        query, params = self._page_query(projection, patient_id, limit, before, before_id)
+        generation = record_cache.generation()
+        try:
+            results = await adb.execute_query(query, params)
+            record_cache.set(key, results, generation)
+            return _copy_rows(results)
+        except Exception as e:
+            logger.error("Failed to get all %s for patient %s: %s", self.table_name, patient_id, e)
+            raise DatabaseError(f"Failed to retrieve {self.table_name}")
     
-    def get_all(self, patient_id: int) -> List[Dict[str, Any]]:
-        """Get all records for a patient"""
-        query = f"SELECT * FROM {self.table_name} WHERE patient_id = %s ORDER BY created_at DESC"
+    def get_all_columnar(self, patient_id: int, columns: Optional[Sequence[str]] = None,
+                         limit: Optional[int] = DEFAULT_PAGE_SIZE, before: Optional[datetime] = None,
+                         before_id: Optional[int] = None) -> Dict[str, List]:
+        """Get one page of a patient's records as a {columns, rows} envelope"""
+        query, params = self._page_query(self._projection(columns), patient_id, limit, before, before_id)
         try:
-            return db.execute_query(query, (patient_id,))
+            return db.execute_query_columnar(query, params)
         except Exception as e:
-            logger.error(f"Failed to get all {self.table_name} for patient {patient_id}: {e}")
+            logger.error("Failed to get all %s for patient %s: %s", self.table_name, patient_id, e)
             raise DatabaseError(f"Failed to retrieve {self.table_name}")
     
+    def iter_all(self, patient_id: int, columns: Optional[Sequence[str]] = None,
+                 chunksize: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over all of a patient's records, newest first, without loading them all at once
+        Rows arrive chunksize at a time from a server-side cursor and bypass the read cache
+        """
+        query, params = self._page_query(self._projection(columns), patient_id, None, None, None)
+        return db.iter_query(query, params, chunksize)
+    
     def get_by_id(self, record_id: int) -> Optional[Dict[str, Any]]:
         """Get a specific record by ID"""
-        query = f"SELECT * FROM {self.table_name} WHERE id = %s"
+        key = (self.table_name, 'id', _cache_id(record_id))
+        cached = record_cache.get(key)
+        if cached is not _MISSING:
+            return dict(cached) if cached else None
+        
         try:
-            results = db.execute_query(query, (record_id,))
-            return results[0] if results else None
+            record = _load_one(key, self._get_by_id_sql, (record_id,))
+            return dict(record) if record else None
         except Exception as e:
-            logger.error(f"Failed to get {self.table_name} record {record_id}: {e}")
+            logger.error("Failed to get %s record %s: %s", self.table_name, record_id, e)
             raise DatabaseError(f"Failed to retrieve {self.table_name} record")
     
+    def hot_queries(self) -> List[str]:
+        """Statements this service runs on most requests, for db.warm_connections()"""
+        queries = [db.insert_sql(self.table_name), self._update_sql, self._get_by_id_sql]
+        if 'patient_id' in self._insert_columns:
+            queries.append(self._page_query(self._projection(None), 0, DEFAULT_PAGE_SIZE, None, None)[0])
+        return queries
+    
+    def _invalidate(self, patient_id: Any = None, record_id: Any = None, all_patients: bool = False):
+        """Drop cached reads made stale by a write to this table; all_patients when the owners aren't known"""
+        if patient_id is not None:
+            # Drop the list under every projection
+            stale = (self.table_name, 'patient', _cache_id(patient_id))
+            record_cache.discard_where(lambda key: key[:3] == stale)
+            record_cache.pop(('patients', 'chart', _cache_id(patient_id)))
+        if record_id is not None:
+            record_cache.pop((self.table_name, 'id', _cache_id(record_id)))
+            # The owning patient isn't known without a query
+            all_patients = True
+        if all_patients:
+            # Drop this table's patient lists and every cached chart
+            record_cache.discard_where(lambda key: (key[0] == self.table_name and key[1] == 'patient')
+                                       or key[1] == 'chart')
+    
+    def _adapt_json(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Wrap JSONB column values so psycopg2 sends them as JSON; data is returned as-is without any"""
+        if not self._json_columns:
+            return data
+        return {**data, **{column: Json(data[column]) for column in self._json_columns
+                           if data.get(column) is not None}}
+    
+    def _insert_values(self, data: Dict[str, Any], patient_id: Any = None) -> tuple:
+        """Build INSERT parameters in TABLE_COLUMNS order, filling gaps from column_defaults"""
+        data = self._adapt_json(data)
+        defaults = self.column_defaults
+        return tuple(
+            patient_id if column == 'patient_id' and patient_id is not None
+            else data.get(column, defaults.get(column))
+            for column in self._insert_columns
+        )
+    
+    def _create(self, params: tuple) -> int:
+        """Insert one record from _insert_values() parameters and return its ID"""
+        try:
+            # Only the new ID is read back, so skip building a dict for it
+            result = db.execute_query(db.insert_sql(self.table_name), params, cursor_factory=NamedTupleCursor)
+            if self._insert_columns[0] == 'patient_id':
+                self._invalidate(patient_id=params[0])
+            record_id = result[0].id
+            logger.info("Created %s record with ID %s", self.record_label, record_id)
+            return record_id
+        except Exception as e:
+            logger.error("Failed to create %s: %s", self.record_label, e)
+            raise DatabaseError(f"Failed to create {self.record_label} record")
+    
+    def update(self, record_id: int, data: Dict[str, Any]) -> bool:
+        """Update a record, setting every writable column from data"""
+        data = self._adapt_json(data)
+        params = tuple(data.get(column) for column in self._update_columns) + (record_id,)
+        
+        try:
+            db.execute_query(self._update_sql, params, fetch=False)
+            self._invalidate(record_id=record_id)
+            logger.info("Updated %s %s", self.record_label, record_id)
+            return True
+        except Exception as e:
+            logger.error("Failed to update %s %s: %s", self.record_label, record_id, e)
+            raise DatabaseError(f"Failed to update {self.record_label} record")
+    
+    def upsert(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Create a record, or overwrite it in place when data['id'] is set
+        One INSERT or UPDATE ... RETURNING * round trip; returns the stored row,
+        or None when data['id'] names no existing record
+        """
+        if data.get('id') is not None:
+            adapted = self._adapt_json(data)
+            query = self._update_returning_sql
+            values = tuple(adapted.get(column) for column in self._update_columns) + (data['id'],)
+        else:
+            query, values = self._insert_returning_sql, self._insert_values(data)
+        
+        try:
+            rows = db.execute_query(query, values)
+            if not rows:
+                return None
+            record = rows[0]
+            self._invalidate(patient_id=record.get('patient_id'), record_id=record['id'])
+            logger.info("Upserted %s record %s", self.record_label, record['id'])
+            return record
+        except Exception as e:
+            logger.error("Failed to upsert %s record: %s", self.record_label, e)
+            raise DatabaseError(f"Failed to save {self.record_label} record")
+    
+    def create_many(self, rows: List[Dict[str, Any]], patient_id: Optional[int] = None) -> List[int]:
+        """
+        Create many records in batched multi-row INSERTs within one transaction
+        For patient sub-records, patient_id (when given) is set on every row
+        """
+        values = [self._insert_values(row, patient_id) for row in rows]
+        
+        try:
+            record_ids = db.insert_many(self.table_name, values)
+            self._invalidate(patient_id=patient_id, all_patients=patient_id is None)
+            logger.info("Created %s %s records", len(record_ids), self.table_name)
+            return record_ids
+        except Exception as e:
+            logger.error("Failed to create %s records: %s", self.table_name, e)
+            raise DatabaseError(f"Failed to create {self.table_name} records")
+    
     def delete(self, record_id: int) -> bool:
         """Delete a record by ID"""
         query = f"DELETE FROM {self.table_name} WHERE id = %s"
         try:
             db.execute_query(query, (record_id,), fetch=False)
-            logger.info(f"Deleted {self.table_name} record {record_id}")
+            self._invalidate(record_id=record_id)
+            if self.table_name == 'patients':
+                # Deleting a patient cascades to every sub-record table
+                deleted_id = _cache_id(record_id)
+                record_cache.discard_where(lambda key: key[1] == 'patient' and key[2] == deleted_id)
+            logger.info("Deleted %s record %s", self.table_name, record_id)
             return True
         except Exception as e:
-            logger.error(f"Failed to delete {self.table_name} record {record_id}: {e}")
+            logger.error("Failed to delete %s record %s: %s", self.table_name, record_id, e)
             raise DatabaseError(f"Failed to delete {self.table_name} record")
 
+# Patient sub-record tables, in chart order
+CHART_TABLES = ('medications', 'conditions', 'diagnoses', 'clinical_notes',
+                'allergies', 'immunizations', 'appointments')
+
 class PatientService(BaseService):
     """Service for patient demographics operations"""
     
+    # Search hits whose charts are loaded in the background, on the bet the user opens one next
+    PREFETCH_CHARTS = 3
+    
+    # Demographics plus one JSON array per sub-record table, newest first, in a single statement
+    FULL_CHART_QUERY = (
+        "SELECT row_to_json(p) AS patient, "
+        + ", ".join(
+            f"(SELECT COALESCE(json_agg(t ORDER BY t.created_at DESC), '[]'::json) "
+            f"FROM {table} t WHERE t.patient_id = p.id) AS {table}"
+            for table in CHART_TABLES
+        )
+        + " FROM patients p WHERE p.id = %s"
+    )
+    
     def __init__(self):
-        super().__init__("patients")
+        super().__init__("patients", "patient")
     
     def create(self, patient_data: Dict[str, Any]) -> int:
         """Create a new patient record"""
-        query = """
-            INSERT INTO patients (first_name, last_name, date_of_birth, gender, phone, email, 
-                                address, emergency_contact, insurance)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id
+        return self._create(self._insert_values(patient_data))
+    
+    # ILIKE on the bare columns can use the pg_trgm GIN indexes; LOWER() would hide them
+    SEARCH_QUERY = """
+            SELECT id, first_name, last_name, date_of_birth, gender 
+            FROM patients 
+            WHERE first_name ILIKE %s OR last_name ILIKE %s
+            ORDER BY last_name, first_name
         """
-        
-        params = (
-            patient_data.get('first_name'),
-            patient_data.get('last_name'),
-            patient_data.get('date_of_birth'),
-            patient_data.get('gender'),
-            patient_data.get('phone'),
-            patient_data.get('email'),
-            patient_data.get('address'),
-            patient_data.get('emergency_contact'),
-            patient_data.get('insurance')
-        )
-        
+    
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        """Search patients by name"""
+        search_term = f"%{query}%"
         try:
-            result = db.execute_query(query, params)
-            patient_id = result[0]['id']
-            logger.info(f"Created patient record with ID {patient_id}")
-            return patient_id
+            results = db.execute_query(self.SEARCH_QUERY, (search_term, search_term))
         except Exception as e:
-            logger.error(f"Failed to create patient: {e}")
-            raise DatabaseError("Failed to create patient record")
+            logger.error("Failed to search patients: %s", e)
+            raise DatabaseError("Failed to search patients")
+        
+        for patient in results[:self.PREFETCH_CHARTS]:
+            _chart_executor.submit(self._prefetch_chart, patient['id'])
+        return results
     
-    def update(self, patient_id: int, patient_data: Dict[str, Any]) -> bool:
-        """Update patient demographics"""
+    def find_by_insurance(self, criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Find patients whose structured insurance contains criteria, e.g. {'carrier': 'Aetna'}
+        Served by the jsonb_path_ops GIN index; free-text insurance values never match
+        """
         query = """
-            UPDATE patients 
-            SET first_name = %s, last_name = %s, date_of_birth = %s, gender = %s, 
-                phone = %s, email = %s, address = %s, emergency_contact = %s, 
-                insurance = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
+            SELECT id, first_name, last_name, date_of_birth, gender, insurance
+            FROM patients
+            WHERE insurance @> %s
+            ORDER BY last_name, first_name
         """
-        
-        params = (
-            patient_data.get('first_name'),
-            patient_data.get('last_name'),
-            patient_data.get('date_of_birth'),
-            patient_data.get('gender'),
-            patient_data.get('phone'),
-            patient_data.get('email'),
-            patient_data.get('address'),
-            patient_data.get('emergency_contact'),
-            patient_data.get('insurance'),
-            patient_id
-        )
-        
         try:
-            db.execute_query(query, params, fetch=False)
-            logger.info(f"Updated patient {patient_id}")
-            return True
+            return db.execute_query(query, (Json(criteria),))
         except Exception as e:
-            logger.error(f"Failed to update patient {patient_id}: {e}")
-            raise DatabaseError("Failed to update patient record")
+            logger.error("Failed to find patients by insurance: %s", e)
+            raise DatabaseError("Failed to search patients")
     
-    def search(self, query: str) -> List[Dict[str, Any]]:
-        """Search patients by name"""
-        search_query = """
-            SELECT id, first_name, last_name, date_of_birth, gender 
-            FROM patients 
-            WHERE LOWER(first_name) LIKE %s OR LOWER(last_name) LIKE %s
-            ORDER BY last_name, first_name
+    def _prefetch_chart(self, patient_id: int):
+        """Warm the chart cache; a failed guess only costs the query"""
+        try:
+            self.get_full_chart(patient_id)
+        except DatabaseError:
+            logger.debug("Chart prefetch for patient %s failed", patient_id)
+    
+    def get_full_chart(self, patient_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get a patient's demographics and all sub-records in one round trip
+        Returns {'patient': {...}, '<table>': [...], ...} or None if the patient doesn't exist
         """
+        key = (self.table_name, 'chart', _cache_id(patient_id))
+        cached = record_cache.get(key)
+        if cached is not _MISSING:
+            return copy.deepcopy(cached) if cached else None
         
-        search_term = f"%{query.lower()}%"
         try:
-            return db.execute_query(search_query, (search_term, search_term))
+            chart = _load_one(key, self.FULL_CHART_QUERY, (patient_id,))
+            # The chart's record lists are cached too, so the caller gets its own copy of them
+            return copy.deepcopy(chart) if chart else None
         except Exception as e:
-            logger.error(f"Failed to search patients: {e}")
-            raise DatabaseError("Failed to search patients")
+            logger.error("Failed to get chart for patient %s: %s", patient_id, e)
+            raise DatabaseError("Failed to retrieve patient chart")
+    
+    def hot_queries(self) -> List[str]:
+        """Statements this service runs on most requests, for db.warm_connections()"""
+        return super().hot_queries() + [self.SEARCH_QUERY, self.FULL_CHART_QUERY]
     
     def get_by_id(self, patient_id: int) -> Optional[Dict[str, Any]]:
         """Get patient by ID"""
-        query = "SELECT * FROM patients WHERE id = %s"
+        key = (self.table_name, 'id', _cache_id(patient_id))
+        cached = record_cache.get(key)
+        if cached is not _MISSING:
+            return dict(cached) if cached else None
+        
         try:
-            results = db.execute_query(query, (patient_id,))
-            return results[0] if results else None
+            patient = _load_one(key, self._get_by_id_sql, (patient_id,))
+            return dict(patient) if patient else None
         except Exception as e:
-            logger.error(f"Failed to get patient {patient_id}: {e}")
+            logger.error("Failed to get patient %s: %s", patient_id, e)
             raise DatabaseError("Failed to retrieve patient")
 
 class MedicationService(BaseService):
     """Service for medication operations"""
     
+    DEFAULT_COLUMNS = ('id', 'patient_id', 'name', 'dosage', 'frequency', 'start_date', 'end_date',
+                       'prescribing_doctor', 'status', 'created_at')
+    
+    column_defaults = {'status': 'Active'}
+    
     def __init__(self):
-        super().__init__("medications")
+        super().__init__("medications", "medication")
     
     def create(self, patient_id: int, medication_data: Dict[str, Any]) -> int:
         """Create a new medication record"""
-        query = """
-            INSERT INTO medications (patient_id, name, dosage, frequency, start_date, 
-                                   end_date, prescribing_doctor, status)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id
-        """
-        
-        params = (
-            patient_id,
-            medication_data.get('name'),
-            medication_data.get('dosage'),
-            medication_data.get('frequency'),
-            medication_data.get('start_date'),
-            medication_data.get('end_date'),
-            medication_data.get('prescribing_doctor'),
-            medication_data.get('status', 'Active')
-        )
-        
-        try:
-            result = db.execute_query(query, params)
-            medication_id = result[0]['id']
-            logger.info(f"Created medication record with ID {medication_id}")
-            return medication_id
-        except Exception as e:
-            logger.error(f"Failed to create medication: {e}")
-            raise DatabaseError("Failed to create medication record")
-    
-    def update(self, medication_id: int, medication_data: Dict[str, Any]) -> bool:
-        """Update medication record"""
-        query = """
-            UPDATE medications 
-            SET name = %s, dosage = %s, frequency = %s, start_date = %s, 
-                end_date = %s, prescribing_doctor = %s, status = %s, 
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-        """
-        
-        params = (
-            medication_data.get('name'),
-            medication_data.get('dosage'),
-            medication_data.get('frequency'),
-            medication_data.get('start_date'),
-            medication_data.get('end_date'),
-            medication_data.get('prescribing_doctor'),
-            medication_data.get('status'),
-            medication_id
-        )
-        
-        try:
-            db.execute_query(query, params, fetch=False)
-            logger.info(f"Updated medication {medication_id}")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to update medication {medication_id}: {e}")
-            raise DatabaseError("Failed to update medication record")
+        return self._create(self._insert_values(medication_data, patient_id))
 
 class ConditionService(BaseService):
     """Service for medical condition operations"""
     
+    DEFAULT_COLUMNS = ('id', 'patient_id', 'name', 'icd_code', 'status', 'date_diagnosed', 'severity', 'created_at')
+    
+    column_defaults = {'status': 'Active'}
+    
     def __init__(self):
-        super().__init__("conditions")
+        super().__init__("conditions", "condition")
     
     def create(self, patient_id: int, condition_data: Dict[str, Any]) -> int:
         """Create a new condition record"""
-        query = """
-            INSERT INTO conditions (patient_id, name, icd_code, status, date_diagnosed, severity)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            RETURNING id
-        """
-        
-        params = (
-            patient_id,
-            condition_data.get('name'),
-            condition_data.get('icd_code'),
-            condition_data.get('status', 'Active'),
-            condition_data.get('date_diagnosed'),
-            condition_data.get('severity')
-        )
-        
-        try:
-            result = db.execute_query(query, params)
-            condition_id = result[0]['id']
-            logger.info(f"Created condition record with ID {condition_id}")
-            return condition_id
-        except Exception as e:
-            logger.error(f"Failed to create condition: {e}")
-            raise DatabaseError("Failed to create condition record")
-    
-    def update(self, condition_id: int, condition_data: Dict[str, Any]) -> bool:
-        """Update condition record"""
-        query = """
-            UPDATE conditions 
-            SET name = %s, icd_code = %s, status = %s, date_diagnosed = %s, 
-                severity = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-        """
-        
-        params = (
-            condition_data.get('name'),
-            condition_data.get('icd_code'),
-            condition_data.get('status'),
-            condition_data.get('date_diagnosed'),
-            condition_data.get('severity'),
-            condition_id
-        )
-        
-        try:
-            db.execute_query(query, params, fetch=False)
-            logger.info(f"Updated condition {condition_id}")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to update condition {condition_id}: {e}")
-            raise DatabaseError("Failed to update condition record")
+        return self._create(self._insert_values(condition_data, patient_id))
 
 class DiagnosisService(BaseService):
     """Service for diagnosis operations"""
     
+    # List views leave out the free-text notes
+    DEFAULT_COLUMNS = ('id', 'patient_id', 'date', 'primary_diagnosis', 'secondary_diagnosis', 'provider', 'created_at')
+    
     def __init__(self):
-        super().__init__("diagnoses")
+        super().__init__("diagnoses", "diagnosis")
     
     def create(self, patient_id: int, diagnosis_data: Dict[str, Any]) -> int:
         """Create a new diagnosis record"""
-        query = """
-            INSERT INTO diagnoses (patient_id, date, primary_diagnosis, secondary_diagnosis, 
-                                 provider, notes)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            RETURNING id
-        """
-        
-        params = (
-            patient_id,
-            diagnosis_data.get('date'),
-            diagnosis_data.get('primary_diagnosis'),
-            diagnosis_data.get('secondary_diagnosis'),
-            diagnosis_data.get('provider'),
-            diagnosis_data.get('notes')
-        )
-        
-        try:
-            result = db.execute_query(query, params)
-            diagnosis_id = result[0]['id']
-            logger.info(f"Created diagnosis record with ID {diagnosis_id}")
-            return diagnosis_id
-        except Exception as e:
-            logger.error(f"Failed to create diagnosis: {e}")
-            raise DatabaseError("Failed to create diagnosis record")
-    
-    def update(self, diagnosis_id: int, diagnosis_data: Dict[str, Any]) -> bool:
-        """Update diagnosis record"""
-        query = """
-            UPDATE diagnoses 
-            SET date = %s, primary_diagnosis = %s, secondary_diagnosis = %s, 
-                provider = %s, notes = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-        """
-        
-        params = (
-            diagnosis_data.get('date'),
-            diagnosis_data.get('primary_diagnosis'),
-            diagnosis_data.get('secondary_diagnosis'),
-            diagnosis_data.get('provider'),
-            diagnosis_data.get('notes'),
-            diagnosis_id
-        )
-        
-        try:
-            db.execute_query(query, params, fetch=False)
-            logger.info(f"Updated diagnosis {diagnosis_id}")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to update diagnosis {diagnosis_id}: {e}")
-            raise DatabaseError("Failed to update diagnosis record")
+        return self._create(self._insert_values(diagnosis_data, patient_id))
 
 class ClinicalNoteService(BaseService):
     """Service for clinical note operations"""
     
+    # List views leave out the note body, which can run to several KB
+    DEFAULT_COLUMNS = ('id', 'patient_id', 'date', 'provider', 'type', 'created_at')
+    
     def __init__(self):
-        super().__init__("clinical_notes")
+        super().__init__("clinical_notes", "clinical note")
     
     def create(self, patient_id: int, note_data: Dict[str, Any]) -> int:
         """Create a new clinical note record"""
-        query = """
-            INSERT INTO clinical_notes (patient_id, date, provider, type, note)
-            VALUES (%s, %s, %s, %s, %s)
-            RETURNING id
-        """
-        
-        params = (
-            patient_id,
-            note_data.get('date'),
-            note_data.get('provider'),
-            note_data.get('type'),
-            note_data.get('note')
-        )
-        
-        try:
-            result = db.execute_query(query, params)
-            note_id = result[0]['id']
-            logger.info(f"Created clinical note record with ID {note_id}")
-            return note_id
-        except Exception as e:
-            logger.error(f"Failed to create clinical note: {e}")
-            raise DatabaseError("Failed to create clinical note record")
-    
-    def update(self, note_id: int, note_data: Dict[str, Any]) -> bool:
-        """Update clinical note record"""
-        query = """
-            UPDATE clinical_notes 
-            SET date = %s, provider = %s, type = %s, note = %s, 
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-        """
-        
-        params = (
-            note_data.get('date'),
-            note_data.get('provider'),
-            note_data.get('type'),
-            note_data.get('note'),
-            note_id
-        )
-        
-        try:
-            db.execute_query(query, params, fetch=False)
-            logger.info(f"Updated clinical note {note_id}")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to update clinical note {note_id}: {e}")
-            raise DatabaseError("Failed to update clinical note record")
+        return self._create(self._insert_values(note_data, patient_id))
 
 class AllergyService(BaseService):
     """Service for allergy operations"""
     
+    DEFAULT_COLUMNS = ('id', 'patient_id', 'allergen', 'reaction', 'severity', 'date_identified', 'created_at')
+    
     def __init__(self):
-        super().__init__("allergies")
+        super().__init__("allergies", "allergy")
     
     def create(self, patient_id: int, allergy_data: Dict[str, Any]) -> int:
         """Create a new allergy record"""
-        query = """
-            INSERT INTO allergies (patient_id, allergen, reaction, severity, date_identified)
-            VALUES (%s, %s, %s, %s, %s)
-            RETURNING id
-        """
-        
-        params = (
-            patient_id,
-            allergy_data.get('allergen'),
-            allergy_data.get('reaction'),
-            allergy_data.get('severity'),
-            allergy_data.get('date_identified')
-        )
-        
-        try:
-            result = db.execute_query(query, params)
-            allergy_id = result[0]['id']
-            logger.info(f"Created allergy record with ID {allergy_id}")
-            return allergy_id
-        except Exception as e:
-            logger.error(f"Failed to create allergy: {e}")
-            raise DatabaseError("Failed to create allergy record")
-    
-    def update(self, allergy_id: int, allergy_data: Dict[str, Any]) -> bool:
-        """Update allergy record"""
-        query = """
-            UPDATE allergies 
-            SET allergen = %s, reaction = %s, severity = %s, date_identified = %s, 
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-        """
-        
-        params = (
-            allergy_data.get('allergen'),
-            allergy_data.get('reaction'),
-            allergy_data.get('severity'),
-            allergy_data.get('date_identified'),
-            allergy_id
-        )
-        
-        try:
-            db.execute_query(query, params, fetch=False)
-            logger.info(f"Updated allergy {allergy_id}")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to update allergy {allergy_id}: {e}")
-            raise DatabaseError("Failed to update allergy record")
+        return self._create(self._insert_values(allergy_data, patient_id))
 
 class ImmunizationService(BaseService):
     """Service for immunization operations"""
     
+    DEFAULT_COLUMNS = ('id', 'patient_id', 'vaccine', 'date_administered', 'provider', 'lot_number', 'created_at')
+    
     def __init__(self):
-        super().__init__("immunizations")
+        super().__init__("immunizations", "immunization")
     
     def create(self, patient_id: int, immunization_data: Dict[str, Any]) -> int:
         """Create a new immunization record"""
-        query = """
-            INSERT INTO immunizations (patient_id, vaccine, date_administered, provider, lot_number)
-            VALUES (%s, %s, %s, %s, %s)
-            RETURNING id
-        """
-        
-        params = (
-            patient_id,
-            immunization_data.get('vaccine'),
-            immunization_data.get('date_administered'),
-            immunization_data.get('provider'),
-            immunization_data.get('lot_number')
-        )
-        
-        try:
-            result = db.execute_query(query, params)
-            immunization_id = result[0]['id']
-            logger.info(f"Created immunization record with ID {immunization_id}")
-            return immunization_id
-        except Exception as e:
-            logger.error(f"Failed to create immunization: {e}")
-            raise DatabaseError("Failed to create immunization record")
-    
-    def update(self, immunization_id: int, immunization_data: Dict[str, Any]) -> bool:
-        """Update immunization record"""
-        query = """
-            UPDATE immunizations 
-            SET vaccine = %s, date_administered = %s, provider = %s, lot_number = %s, 
-                updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-        """
-        
-        params = (
-            immunization_data.get('vaccine'),
-            immunization_data.get('date_administered'),
-            immunization_data.get('provider'),
-            immunization_data.get('lot_number'),
-            immunization_id
-        )
-        
-        try:
-            db.execute_query(query, params, fetch=False)
-            logger.info(f"Updated immunization {immunization_id}")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to update immunization {immunization_id}: {e}")
-            raise DatabaseError("Failed to update immunization record")
+        return self._create(self._insert_values(immunization_data, patient_id))
 
 class AppointmentService(BaseService):
     """Service for appointment operations"""
     
+    # List views leave out the free-text notes
+    DEFAULT_COLUMNS = ('id', 'patient_id', 'date', 'time', 'provider', 'type', 'status', 'created_at')
+    
+    column_defaults = {'status': 'Scheduled'}
+    
     def __init__(self):
-        super().__init__("appointments")
+        super().__init__("appointments", "appointment")
     
     def create(self, patient_id: int, appointment_data: Dict[str, Any]) -> int:
         """Create a new appointment record"""
-        #pdb.set_trace()
-        query = """
-            INSERT INTO appointments (patient_id, date, time, provider, type, status, notes)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            RETURNING id
-        """
-        
-        params = (
-            patient_id,
-            appointment_data.get('date'),
-            appointment_data.get('time'),
-            appointment_data.get('provider'),
-            appointment_data.get('type'),
-            appointment_data.get('status', 'Scheduled'),
-            appointment_data.get('notes')
-        )
-        
-        try:
-            result = db.execute_query(query, params)
-            appointment_id = result[0]['id']
-            logger.info(f"Created appointment record with ID {appointment_id}")
-            return appointment_id
-        except Exception as e:
-            logger.error(f"Failed to create appointment: {e}")
-            raise DatabaseError("Failed to create appointment record")
-    
-    def update(self, appointment_id: int, appointment_data: Dict[str, Any]) -> bool:
-        """Update appointment record"""
-        query = """
-            UPDATE appointments 
-            SET date = %s, time = %s, provider = %s, type = %s, status = %s, 
-                notes = %s, updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-        """
-        
-        params = (
-            appointment_data.get('date'),
-            appointment_data.get('time'),
-            appointment_data.get('provider'),
-            appointment_data.get('type'),
-            appointment_data.get('status'),
-            appointment_data.get('notes'),
-            appointment_id
-        )
-        
-        try:
-            db.execute_query(query, params, fetch=False)
-            logger.info(f"Updated appointment {appointment_id}")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to update appointment {appointment_id}: {e}")
-            raise DatabaseError("Failed to update appointment record")
+        return self._create(self._insert_values(appointment_data, patient_id))
 
 # Service instances
 patient_service = PatientService()
@@ -574,3 +660,31 @@ clinical_note_service = ClinicalNoteService()
 allergy_service = AllergyService()
 immunization_service = ImmunizationService()
 appointment_service = AppointmentService()
+
+# Sub-record services that make up a patient chart, keyed by table name
+chart_services = {
+    service.table_name: service
+    for service in (medication_service, condition_service, diagnosis_service, clinical_note_service,
+                    allergy_service, immunization_service, appointment_service)
+}
+
+# Worker threads for chart fan-out; psycopg2 releases the GIL while waiting on the server
+_chart_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='emr-chart')
+
+def get_patient_bundle(patient_id: int) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Fetch all of a patient's sub-records concurrently, keyed by table name
+    Page build time becomes the slowest query instead of the sum of all seven
+    """
+    futures = {
+        table: _chart_executor.submit(service.get_all, patient_id)
+        for table, service in chart_services.items()
+    }
+    return {table: future.result() for table, future in futures.items()}
+
+def warm_prepared_statements() -> int:
+    """Prepare every service's hot queries on all pooled connections; returns the connections warmed"""
+    queries = patient_service.hot_queries()
+    for service in chart_services.values():
+        queries.extend(service.hot_queries())
+    return db.warm_connections(queries)
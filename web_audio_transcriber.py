@@ -4,23 +4,71 @@ Web-based Audio Transcriber Integration
 Connects the audio transcriber with the EMR system via web APIs
 """
 
+import queue
 import threading
 import time
 import requests
-import json
+import orjson
 import logging
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from audio_transcriber import AudioTranscriber
 
 logger = logging.getLogger(__name__)
 
+# Statuses that mean the server turned a request away before handling it, so even a POST is safe to resend
+POST_RETRY_STATUSES = frozenset([429, 503])
+
+class EMRRetry(Retry):
+    """
+    Retry policy for EMR API calls
+    The voice endpoints' POSTs are not idempotent (add-transcription appends to the note, start-recording
+    creates one), so a POST is only resent after a connection error or a POST_RETRY_STATUSES response;
+    a 5xx that may have come back after the write went through is left to the caller to log
+    """
+    
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method == "POST":
+            return status_code in POST_RETRY_STATUSES
+        return super().is_retry(method, status_code, has_retry_after)
+
+# Retry failed connections, throttling and server errors with backoff before giving up on a request;
+# POST is left out of allowed_methods so a read timeout never resends one. Once retries run out the
+# last response is returned for the callers' status checks to log
+HTTP_RETRY = EMRRetry(
+    total=3,
+    connect=3,
+    read=2,
+    status=3,
+    backoff_factor=0.3,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+    raise_on_status=False
+)
+
+# login posts form data, so the JSON content type is set per request rather than on the session
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Transcriptions waiting to be posted; once full, new text is dropped rather than blocking the recording
+TRANSCRIPTION_QUEUE_SIZE = 256
+
 class WebAudioTranscriber:
     def __init__(self, emr_base_url="http://localhost:5000"):
         self.emr_base_url = emr_base_url
         self.session = requests.Session()
+        # Keep connections to the EMR open so each transcription post skips the TCP/TLS handshake
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=20, max_retries=HTTP_RETRY)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         self.current_note_id = None
         self.transcriber = None
         self.is_authenticated = False
         
+        # Transcriptions are posted from a worker thread so a slow EMR never stalls transcription
+        self._tx_queue = queue.Queue(maxsize=TRANSCRIPTION_QUEUE_SIZE)
+        self._tx_stop = threading.Event()
+        self._worker = None
+        
     def login(self, username="admin", password="admin"):
         """Login to the EMR system"""
         try:
@@ -38,6 +86,10 @@ class WebAudioTranscriber:
             logger.error(f"Error logging into EMR: {e}")
             return False
     
+    def _post_json(self, path, data):
+        """POST data to an EMR API endpoint as an orjson-encoded body"""
+        return self.session.post(f"{self.emr_base_url}{path}", data=orjson.dumps(data), headers=JSON_HEADERS)
+    
     def start_recording_session(self, patient_id, provider="Voice Transcription"):
         """Start a new recording session"""
         if not self.is_authenticated:
@@ -50,11 +102,7 @@ class WebAudioTranscriber:
                 "provider": provider
             }
             
-            response = self.session.post(
-                f"{self.emr_base_url}/api/voice/start-recording",
-                json=data,
-                headers={"Content-Type": "application/json"}
-            )
+            response = self._post_json("/api/voice/start-recording", data)
             
             if response.status_code == 201:
                 result = response.json()
@@ -77,11 +125,7 @@ class WebAudioTranscriber:
         try:
             data = {"note_id": self.current_note_id}
             
-            response = self.session.post(
-                f"{self.emr_base_url}/api/voice/stop-recording",
-                json=data,
-                headers={"Content-Type": "application/json"}
-            )
+            response = self._post_json("/api/voice/stop-recording", data)
             
             success = response.status_code == 200
             if success:
@@ -107,11 +151,7 @@ class WebAudioTranscriber:
                 "transcription": transcription.strip()
             }
             
-            response = self.session.post(
-                f"{self.emr_base_url}/api/voice/add-transcription",
-                json=data,
-                headers={"Content-Type": "application/json"}
-            )
+            response = self._post_json("/api/voice/add-transcription", data)
             
             success = response.status_code == 200
             if success:
@@ -125,6 +165,29 @@ class WebAudioTranscriber:
             logger.error(f"Error adding transcription: {e}")
             return False
     
+    def _queue_transcription(self, text):
+        """Hand a transcription to the posting worker without blocking the transcriber"""
+        try:
+            self._tx_queue.put_nowait(text)
+        except queue.Full:
+            logger.warning(f"Transcription queue full, dropping: {text[:50]}...")
+    
+    def _drain(self):
+        """Post queued transcriptions until stopped and everything queued has been sent"""
+        while not (self._tx_stop.is_set() and self._tx_queue.empty()):
+            try:
+                texts = [self._tx_queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            
+            # Anything that queued up during the last post goes out in a single request
+            while True:
+                try:
+                    texts.append(self._tx_queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.add_transcription(" ".join(text.strip() for text in texts))
+    
     def start_audio_recording(self, patient_id, model_size="base", chunk_duration=30):
         """Start audio recording with transcription"""
         # Start the recording session
@@ -132,14 +195,15 @@ class WebAudioTranscriber:
         if not note_id:
             return False
         
-        # Create transcriber with callback
-        def on_transcription(text):
-            self.add_transcription(text)
+        self._tx_stop.clear()
+        self._worker = threading.Thread(target=self._drain, name='emr-transcription-poster', daemon=True)
+        self._worker.start()
         
+        # Create transcriber with callback
         self.transcriber = AudioTranscriber(
             model_size=model_size,
             chunk_duration=chunk_duration,
-            on_transcription=on_transcription
+            on_transcription=self._queue_transcription
         )
         
         # Start recording
@@ -155,6 +219,12 @@ class WebAudioTranscriber:
             self.transcriber.stop_recording()
             self.transcriber = None
         
+        # Post the transcriptions still queued before the session closes
+        if self._worker:
+            self._tx_stop.set()
+            self._worker.join()
+            self._worker = None
+        
         # Stop the recording session
         if not self.stop_recording_session():
             success = False
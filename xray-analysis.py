@@ -3,8 +3,12 @@ import skimage, torch, torchvision
 import openai
 import json
 import os
+import sys
 from datetime import datetime
 
+# Run the model on the GPU when there is one, in FP16 autocast there; CPU stays FP32
+device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+
 # Prepare the image:
 img = skimage.io.imread("xray-images/xray1.jpg")
 img = xrv.datasets.normalize(img, 255) # convert 8-bit image to [-1024, 1024] range
@@ -19,10 +23,11 @@ img = transform(img)
 img = torch.from_numpy(img)
 
 # Load model and process image
-model = xrv.models.DenseNet(weights="densenet121-res224-all")
-outputs = model(img[None,...]) # or model.features(img[None,...])
+model = xrv.models.DenseNet(weights="densenet121-res224-all").to(device).eval()
+with torch.inference_mode(), torch.autocast(device_type=device.type, dtype=torch.float16, enabled=device.type == 'cuda'):
+    outputs = model(img[None,...].to(device)) # or model.features(img[None,...])
 # Print results
-results = dict(zip(model.pathologies, outputs[0].detach().numpy()))
+results = dict(zip(model.pathologies, outputs[0].float().cpu().numpy()))
 
 print("=" * 60)
 print("🩻 X-RAY ANALYSIS RESULTS")
@@ -34,7 +39,7 @@ for pathology, score in results.items():
 
 # Send results to GPT-4 for medical interpretation
 def analyze_with_gpt4(xray_results):
-    """Send X-ray analysis results to GPT-4 for medical interpretation"""
+    """Send X-ray analysis results to GPT-4 for medical interpretation, printing the reply as it streams in"""
     
     # Format the results for GPT-4
     results_text = "\n".join([f"- {pathology}: {score:.4f}" for pathology, score in xray_results.items()])
@@ -63,27 +68,37 @@ Format your response as a structured medical report.
             api_key=os.getenv('OPENAI_API_KEY')
         )
         
-        response = client.chat.completions.create(
+        stream = client.chat.completions.create(
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "You are an expert radiologist providing medical interpretations of X-ray analysis results."},
                 {"role": "user", "content": prompt}
             ],
             max_tokens=1000,
-            temperature=0.3
+            temperature=0.3,
+            stream=True
         )
         
-        return response.choices[0].message.content
+        parts = []
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                sys.stdout.write(delta)
+                sys.stdout.flush()
+        sys.stdout.write("\n")
+        return "".join(parts)
         
     except Exception as e:
-        return f"Error connecting to GPT-4: {e}\n\nPlease ensure your OPENAI_API_KEY environment variable is set."
+        message = f"Error connecting to GPT-4: {e}\n\nPlease ensure your OPENAI_API_KEY environment variable is set."
+        print(message)
+        return message
 
 # Get GPT-4 analysis
 print("\n🤖 SENDING TO GPT-4 FOR MEDICAL INTERPRETATION...")
 print("-" * 60)
 
 gpt4_analysis = analyze_with_gpt4(results)
-print(gpt4_analysis)
 
 print("\n" + "=" * 60)
 print("⚠️  IMPORTANT DISCLAIMER")
@@ -6,51 +6,276 @@ Analyzes chest X-rays using torchxrayvision and gets medical interpretation from
 
 import torchxrayvision as xrv
 import skimage, torch, torchvision
+import numpy as np
 import openai
 import json
 import os
+import sys
+import time
 import argparse
+import asyncio
+import functools
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
 import dotenv
 # Load environment variables from .env file
 dotenv.load_dotenv(dotenv_path=".env.openai")
 
+# Run the model on the GPU when there is one, in FP16 autocast there; CPU stays FP32
+DEVICE = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+USE_FP16 = DEVICE.type == 'cuda'
+
+def configure_torch():
+    """
+    Process-wide torch settings for running this script on its own; called from main(), not at import,
+    so importing this module (e.g. from the web app) leaves the host process's torch configuration alone
+    """
+    if USE_FP16:
+        # Inputs are always 1x224x224, so cuDNN can benchmark once and keep the fastest kernels
+        torch.backends.cudnn.benchmark = True
+        return
+    # One image through DenseNet is too little work to spread over every core of a large box;
+    # cap intra-op threads and keep inter-op to one so the threads don't oversubscribe the CPU
+    torch.set_num_threads(min(8, os.cpu_count() or 1))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only settable before torch starts any parallel work
+        pass
+
+MODEL_WEIGHTS = "densenet121-res224-all"
+# Images per forward pass in analyze_xrays_batch; bounds GPU memory on large folders
+BATCH_SIZE = 32
+
+# GPT-4 interpretations already paid for, one text file per score pattern and patient context. They contain
+# patient information, so caching is off unless XRAY_GPT4_CACHE_DIR is set, and entries are owner-only
+GPT4_CACHE_DIR = Path(os.environ['XRAY_GPT4_CACHE_DIR']).expanduser() if os.getenv('XRAY_GPT4_CACHE_DIR') else None
+# Entries older than this are ignored and removed; past the file cap, the oldest go first
+GPT4_CACHE_TTL_SECONDS = int(os.getenv('XRAY_GPT4_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+GPT4_CACHE_MAX_FILES = int(os.getenv('XRAY_GPT4_CACHE_MAX_FILES', '1000'))
+# GPT-4 requests analyze_batch_with_gpt4 keeps in flight at once, to stay inside API rate limits
+GPT4_CONCURRENCY = 8
+
+# Scores below this are not clinically significant (the prompt's "< 0.3"); films with none at or above it skip GPT-4
+SIGNIFICANCE_THRESHOLD = 0.3
+
+MISSING_API_KEY_MESSAGE = "❌ Error: OPENAI_API_KEY environment variable not set.\n\nPlease set your OpenAI API key:\nexport OPENAI_API_KEY='your-api-key-here'"
+
+# Center-crop to a square and resize to the model's 224x224 input; stateless, so built once and shared
+XRAY_TRANSFORM = torchvision.transforms.Compose([
+    xrv.datasets.XRayCenterCrop(),
+    xrv.datasets.XRayResizer(224),
+])
+
 def load_and_preprocess_image(image_path):
     """Load and preprocess X-ray image for analysis"""
     print(f"📂 Loading image: {image_path}")
     
     # Prepare the image
     img = skimage.io.imread(image_path)
-    img = xrv.datasets.normalize(img, 255)  # convert 8-bit image to [-1024, 1024] range
-    img = img.mean(2)[None, ...]  # Make single color channel
-
-    transform = torchvision.transforms.Compose([
-        xrv.datasets.XRayCenterCrop(),
-        xrv.datasets.XRayResizer(224),
-    ])
+    # The scaling below assumes 8-bit values, as xrv.datasets.normalize(img, 255) checks;
+    # 16-bit or DICOM-derived images would otherwise be scored as garbage
+    max_value = img.max()
+    if max_value > 255:
+        raise ValueError(f"max value in the image is {max_value}, should be at most 255 (8-bit image)")
+    # Make single color channel, then convert 8-bit values to the [-1024, 1024] range in place.
+    # Same result as xrv.datasets.normalize(img, 255) followed by img.mean(2), since both are
+    # linear, but only one float array the size of a single channel is allocated
+    if img.ndim == 3:
+        img = img.mean(axis=2, dtype=np.float32)
+    else:
+        img = img.astype(np.float32)
+    img *= 2048.0 / 255
+    img -= 1024.0
+    img = img[None, ...]
 
-    img = transform(img)
+    img = XRAY_TRANSFORM(img)
     img = torch.from_numpy(img)
     
     return img
 
-def analyze_xray_with_model(img):
-    """Analyze X-ray image using torchxrayvision model"""
-    print("🔬 Loading DenseNet model and analyzing...")
+def _autocast():
+    """FP16 autocast on CUDA; a no-op on CPU"""
+    return torch.autocast(device_type=DEVICE.type, dtype=torch.float16, enabled=USE_FP16)
+
+def _compile_model(model):
+    """
+    Specialize the model for 224x224 inputs and run it once so the first X-ray doesn't pay for compilation
+    Tries torch.compile, then a TorchScript trace, and keeps the eager model if neither works
+    """
+    example = torch.zeros(1, 1, 224, 224, device=DEVICE)
     
-    # Load model and process image
-    model = xrv.models.DenseNet(weights="densenet121-res224-all")
-    outputs = model(img[None,...])
+    try:
+        compiled = torch.compile(model, mode='reduce-overhead')
+        with torch.inference_mode(), _autocast():
+            compiled(example)
+        return compiled
+    except Exception as e:
+        print(f"⚠️ torch.compile unavailable ({e}), trying TorchScript")
     
-    # Get results
-    results = dict(zip(model.pathologies, outputs[0].detach().numpy()))
+    try:
+        traced = torch.jit.trace(model, example)
+        if DEVICE.type == 'cpu':
+            # Freeze and fuse Conv+BN+ReLU into oneDNN kernels for CPU inference
+            traced = torch.jit.optimize_for_inference(traced)
+        with torch.inference_mode(), _autocast():
+            traced(example)
+        return traced
+    except Exception as e:
+        print(f"⚠️ TorchScript trace failed ({e}), using the eager model")
     
+    return model
+
+@functools.lru_cache(maxsize=2)
+def _load_model(weights=MODEL_WEIGHTS):
+    """
+    Load and compile a DenseNet on DEVICE once per process; later calls reuse it
+    Returns (model, pathology labels), since a traced model no longer carries the labels
+    """
+    print(f"🔬 Loading DenseNet model ({weights})...")
+    model = xrv.models.DenseNet(weights=weights).to(DEVICE).eval()
+    return _compile_model(model), model.pathologies
+
+def _stack(images, buffer=None):
+    """
+    Stack image tensors into one batch, straight into pinned memory when it is headed for CUDA
+    A pinned buffer from an earlier call with room for the images is reused instead of allocating one
+    """
+    if DEVICE.type != 'cuda':
+        return torch.stack(images)
+    if buffer is None or len(buffer) < len(images):
+        buffer = torch.empty((len(images), *images[0].shape), dtype=images[0].dtype, pin_memory=True)
+    return torch.stack(images, out=buffer[:len(images)])
+
+def _upload(batch, copy_stream):
+    """
+    Copy a pinned batch to the GPU on copy_stream, ordered before any work queued after it on the current stream
+    Returns the GPU batch and an event marking when the pinned buffer may be refilled
+    """
+    compute_stream = torch.cuda.current_stream()
+    with torch.cuda.stream(copy_stream):
+        gpu_batch = batch.to(DEVICE, non_blocking=True)
+        copied = torch.cuda.Event()
+        copied.record(copy_stream)
+    compute_stream.wait_event(copied)
+    # Allocated on copy_stream but used on the compute stream; keep the allocator from reusing it early
+    gpu_batch.record_stream(compute_stream)
+    return gpu_batch, copied
+
+def _forward(batch):
+    """
+    Start the model on a [N, 1, 224, 224] batch from _stack()
+    On CUDA the copy from pinned memory and the forward pass are queued and this returns before they finish
+    """
+    model, _ = _load_model()
+    if DEVICE.type == 'cuda':
+        batch = batch.to(DEVICE, non_blocking=True)
+    with torch.inference_mode(), _autocast():
+        # A reduce-overhead model replays a CUDA graph into the same static output buffer on every
+        # call, so mark each call as a new step and clone its output before the next one is queued
+        torch.compiler.cudagraph_mark_step_begin()
+        return model(batch).clone()
+
+def _scores(outputs):
+    """Convert model outputs to one {pathology: score} dict per image, waiting for the GPU if needed"""
+    _, pathologies = _load_model()
+    return [dict(zip(pathologies, row)) for row in outputs.float().cpu().numpy()]
+
+def analyze_xray_with_model(img):
+    """Analyze X-ray image using torchxrayvision model"""
+    print("🔬 Analyzing with DenseNet model...")
+    return _scores(_forward(_stack([img])))[0]
+
+def analyze_xrays_batch(image_paths, batch_size=BATCH_SIZE):
+    """
+    Analyze many X-ray images, batch_size per forward pass
+    Images are loaded in parallel threads while earlier batches run; results are returned in image_paths order.
+    On CUDA, batches alternate between two pinned buffers and upload on a side stream, so the next batch is
+    stacked and copied while the GPU runs the current one
+    """
+    print(f"🔬 Analyzing {len(image_paths)} images with DenseNet model...")
+    copy_stream = torch.cuda.Stream() if DEVICE.type == 'cuda' else None
+    buffers = [None, None]
+    copied = [None, None]
+    results = []
+    pending = None
+    with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+        images = executor.map(load_and_preprocess_image, image_paths)
+        for i, batch_images in enumerate(iter(lambda: list(islice(images, batch_size)), [])):
+            slot = i % 2
+            if copied[slot] is not None:
+                # This buffer fed the upload two batches ago; don't overwrite it mid-copy
+                copied[slot].synchronize()
+            batch = buffers[slot] = _stack(batch_images, buffers[slot])
+            if copy_stream is not None:
+                batch, copied[slot] = _upload(batch, copy_stream)
+            outputs = _forward(batch)
+            # Read the previous batch back only once this one is queued, so the GPU never sits idle
+            if pending is not None:
+                results.extend(_scores(pending))
+            pending = outputs
+    if pending is not None:
+        results.extend(_scores(pending))
     return results
 
-def analyze_with_gpt4(xray_results, patient_info=None):
-    """Send X-ray analysis results to GPT-4 for medical interpretation"""
-    
+def _gpt4_cache_path(xray_results, patient_info):
+    """Cache file for an interpretation, keyed by the scores rounded to 2 decimals and the patient context; None when caching is off"""
+    if GPT4_CACHE_DIR is None:
+        return None
+    key = json.dumps({
+        'scores': {pathology: round(float(score), 2) for pathology, score in sorted(xray_results.items())},
+        'patient': patient_info
+    })
+    return GPT4_CACHE_DIR / f"{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}.txt"
+
+def _load_cached_analysis(cache_path):
+    """Cached interpretation, or None if caching is off or the entry is missing or past its TTL"""
+    if cache_path is None:
+        return None
+    try:
+        if time.time() - cache_path.stat().st_mtime > GPT4_CACHE_TTL_SECONDS:
+            cache_path.unlink(missing_ok=True)
+            return None
+        return cache_path.read_text()
+    except OSError:
+        return None
+
+def _prune_gpt4_cache():
+    """Remove expired entries, then the oldest ones beyond GPT4_CACHE_MAX_FILES"""
+    entries = []
+    for path in GPT4_CACHE_DIR.glob("*.txt"):
+        try:
+            entries.append((path.stat().st_mtime, path))
+        except OSError:
+            continue
+    entries.sort(reverse=True)
+    cutoff = time.time() - GPT4_CACHE_TTL_SECONDS
+    for i, (mtime, path) in enumerate(entries):
+        if i >= GPT4_CACHE_MAX_FILES or mtime < cutoff:
+            path.unlink(missing_ok=True)
+
+def _save_cached_analysis(cache_path, analysis):
+    """Write an interpretation to the cache, readable by the owner only; a cache that can't be written is skipped"""
+    if cache_path is None:
+        return
+    try:
+        GPT4_CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+        os.chmod(GPT4_CACHE_DIR, 0o700)
+        # Write then rename so concurrent readers never see a partial file
+        partial = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        fd = os.open(partial, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(analysis)
+        partial.replace(cache_path)
+        _prune_gpt4_cache()
+    except OSError as e:
+        print(f"⚠️ Could not cache GPT-4 analysis: {e}")
+
+def _gpt4_messages(xray_results, patient_info=None):
+    """Build the chat messages asking GPT-4 to interpret the model's pathology scores"""
     # Format the results for GPT-4
     results_text = "\n".join([f"- {pathology}: {score:.4f}" for pathology, score in xray_results.items()])
     
@@ -82,33 +307,137 @@ Important Guidelines:
 
 Format your response as a structured medical report with clear sections.
 """
+    
+    return [
+        {"role": "system", "content": "You are an expert radiologist providing medical interpretations of X-ray analysis results. Provide structured, professional medical reports."},
+        {"role": "user", "content": prompt}
+    ]
+
+def _is_routine(xray_results):
+    """True when every pathology scores below SIGNIFICANCE_THRESHOLD; a film scoring exactly at it goes to GPT-4"""
+    return bool(xray_results) and max(float(score) for score in xray_results.values()) < SIGNIFICANCE_THRESHOLD
+
+def _routine_report(xray_results):
+    """Canned interpretation for films without significant findings, written without calling GPT-4"""
+    top_scores = sorted(xray_results.items(), key=lambda item: item[1], reverse=True)[:3]
+    scores_text = "\n".join(f"- {pathology}: {score:.4f}" for pathology, score in top_scores)
+    return f"""**Primary Findings**: No findings at or above the clinical significance threshold ({SIGNIFICANCE_THRESHOLD}).
 
+Highest model scores:
+{scores_text}
+
+**Recommended Actions**: Recommend routine follow-up.
+
+**Clinical Summary**: The model suggests no significant abnormality. Findings require clinical correlation."""
+
+def analyze_with_gpt4(xray_results, patient_info=None, echo=False, force_gpt4=False):
+    """
+    Send X-ray analysis results to GPT-4 for medical interpretation
+    The reply is streamed; with echo, it is printed as it arrives. Returns the full text
+    With XRAY_GPT4_CACHE_DIR set, replies are cached on disk, so a repeated score pattern for the same patient skips the API call.
+    Films without significant findings get a canned report instead unless force_gpt4 is set
+    """
+    if not force_gpt4 and _is_routine(xray_results):
+        analysis = _routine_report(xray_results)
+        if echo:
+            print(analysis)
+        return analysis
+    
+    cache_path = _gpt4_cache_path(xray_results, patient_info)
+    analysis = _load_cached_analysis(cache_path)
+    if analysis is not None:
+        if echo:
+            print(analysis)
+        return analysis
+    
     try:
         # Check for API key
         api_key = os.getenv('OPENAI_API_KEY')
         if not api_key:
-            return "❌ Error: OPENAI_API_KEY environment variable not set.\n\nPlease set your OpenAI API key:\nexport OPENAI_API_KEY='your-api-key-here'"
+            return MISSING_API_KEY_MESSAGE
         
         # Initialize OpenAI client
         client = openai.OpenAI(api_key=api_key)
         
         print("🤖 Sending to GPT-4 for medical interpretation...")
         
-        response = client.chat.completions.create(
+        stream = client.chat.completions.create(
             model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are an expert radiologist providing medical interpretations of X-ray analysis results. Provide structured, professional medical reports."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=_gpt4_messages(xray_results, patient_info),
             max_tokens=1500,
-            temperature=0.3
+            temperature=0.3,
+            stream=True
         )
         
-        return response.choices[0].message.content
+        parts = []
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                if echo:
+                    sys.stdout.write(delta)
+                    sys.stdout.flush()
+        if echo:
+            sys.stdout.write("\n")
+        
+        analysis = "".join(parts)
+        if analysis:
+            _save_cached_analysis(cache_path, analysis)
+        return analysis
+        
+    except Exception as e:
+        return f"❌ Error connecting to GPT-4: {e}"
+
+async def analyze_with_gpt4_async(xray_results, patient_info, client, semaphore, force_gpt4=False):
+    """analyze_with_gpt4 on an AsyncOpenAI client, with at most semaphore's worth of requests in flight"""
+    if not force_gpt4 and _is_routine(xray_results):
+        return _routine_report(xray_results)
+    
+    cache_path = _gpt4_cache_path(xray_results, patient_info)
+    cached = _load_cached_analysis(cache_path)
+    if cached is not None:
+        return cached
+    
+    try:
+        async with semaphore:
+            response = await client.chat.completions.create(
+                model="gpt-4o",
+                messages=_gpt4_messages(xray_results, patient_info),
+                max_tokens=1500,
+                temperature=0.3
+            )
+        
+        analysis = response.choices[0].message.content or ""
+        if analysis:
+            _save_cached_analysis(cache_path, analysis)
+        return analysis
         
     except Exception as e:
         return f"❌ Error connecting to GPT-4: {e}"
 
+def analyze_batch_with_gpt4(xray_results_list, patient_info=None, force_gpt4=False):
+    """
+    Interpret many X-ray results with concurrent GPT-4 requests
+    Returns one interpretation per entry of xray_results_list, in the same order
+    """
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        return [MISSING_API_KEY_MESSAGE] * len(xray_results_list)
+    
+    async def run():
+        client = openai.AsyncOpenAI(api_key=api_key)
+        semaphore = asyncio.Semaphore(GPT4_CONCURRENCY)
+        try:
+            return await asyncio.gather(*(
+                analyze_with_gpt4_async(xray_results, patient_info, client, semaphore, force_gpt4)
+                for xray_results in xray_results_list
+            ))
+        finally:
+            await client.close()
+    
+    print(f"🤖 Sending {len(xray_results_list)} analyses to GPT-4...")
+    return asyncio.run(run())
+
 def save_report(image_path, raw_results, gpt4_analysis, output_file=None):
     """Save the complete analysis report to a file"""
     
@@ -117,21 +446,18 @@ def save_report(image_path, raw_results, gpt4_analysis, output_file=None):
         image_name = Path(image_path).stem
         output_file = f"xray_analysis_{image_name}_{timestamp}.txt"
     
+    raw_block = "\n".join(f"{pathology}: {score:.4f}" for pathology, score in raw_results.items())
     report_content = f"""
 CHEST X-RAY ANALYSIS REPORT
-={'=' * 50}
+{'=' * 50}
 
 Analysis Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 Image File: {image_path}
 
 RAW MODEL RESULTS
 {'-' * 30}
-"""
-    
-    for pathology, score in raw_results.items():
-        report_content += f"{pathology}: {score:.4f}\n"
-    
-    report_content += f"""
+{raw_block}
+
 GPT-4 MEDICAL INTERPRETATION
 {'-' * 30}
 {gpt4_analysis}
@@ -150,6 +476,7 @@ AI analysis should supplement, not replace, clinical expertise.
     return output_file
 
 def main():
+    configure_torch()
     image_path = "xray-images/xray1.jpg"
     try:
         # Load and preprocess image
@@ -170,8 +497,10 @@ def main():
         if not args.no_gpt4:
             print(f"\n🤖 GPT-4 Medical Interpretation:")
             print("-" * 60)
-            gpt4_analysis = analyze_with_gpt4(results, args.patient_info)
-            print(gpt4_analysis)
+            gpt4_analysis = analyze_with_gpt4(results, args.patient_info, echo=True)
+            if gpt4_analysis.startswith("❌"):
+                # Errors are returned rather than streamed
+                print(gpt4_analysis)
         
         # Save report
         report_file = save_report(args.image_path, results, gpt4_analysis, args.output)